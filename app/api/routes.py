@@ -2,23 +2,160 @@
 API routes for the Customer Service Chatbot
 """
 
+import asyncio
+import hmac
+import json
 import logging
+from contextlib import aclosing
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from app.models.schemas import (
     ChatRequest,
     ChatResponse,
+    ChatJobRequest,
+    ChatJob,
     HealthResponse,
     ConversationHistory
 )
 from app.services.conversation_manager import conversation_manager
 from app.services.openai_service import openai_service
+from app.services.summarizer import conversation_summarizer
+from app.services.prompt_builder import prompt_builder
+from app.services.hedging import hedging_policy
+from app.services.disconnect_monitor import disconnect_monitor, ClientDisconnected
+from app.services.turn_pipeline import turn_pipeline
+from app.services.chat_jobs import chat_job_queue, JobQueueFull, WebhookNotAllowed
+from app.services.idempotency import idempotency_cache, IdempotencyKeyMismatch
+from app.services.quota_guard import quota_guard
+from app.services.traffic_recorder import traffic_recorder
+from app.services.llm_backends import llm_router
+from app.services.generation_profiles import generation_profiles
 from app.core.config import settings
+from app.core.http_pool import upstream_pool
+from app.core.load_shedding import load_monitor
+from app.core.tracing import tracer, SPAN_KIND_SERVER
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix=settings.API_PREFIX, tags=["chatbot"])
 
+# A WebSocket client went away: Starlette raises WebSocketDisconnect on receive, while the
+# server's send raises an OSError (uvicorn's ClientDisconnected) once the socket is closed
+WEBSOCKET_CLOSED = (WebSocketDisconnect, OSError)
+
+
+def _get_request_deadline(req: Request) -> Optional[float]:
+    """
+    Read the client's latency budget from the X-Deadline-Ms header
+    
+    Args:
+        req: FastAPI Request object
+    
+    Returns:
+        Deadline in seconds, or None to use the default SLO
+    """
+    header = req.headers.get("X-Deadline-Ms")
+    if not header:
+        return None
+    try:
+        deadline_ms = float(header)
+    except ValueError:
+        logger.warning(f"Ignoring invalid X-Deadline-Ms header: {header}")
+        return None
+    if deadline_ms <= 0:
+        return None
+    return deadline_ms / 1000
+
+
+def _has_admin_token(req: Request) -> bool:
+    """
+    Check the request's bearer token against ADMIN_API_TOKEN
+    
+    Args:
+        req: FastAPI Request object
+    
+    Returns:
+        True if the token matches (never while ADMIN_API_TOKEN is unset)
+    """
+    if not settings.ADMIN_API_TOKEN:
+        return False
+    scheme, _, token = req.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(
+        token.strip().encode(), settings.ADMIN_API_TOKEN.encode()
+    )
+
+
+def _require_admin(req: Request) -> None:
+    """
+    Dependency for endpoints that expose every customer's conversations
+    
+    Raises:
+        HTTPException: 403 while ADMIN_API_TOKEN is unset, 401 if the bearer token is missing or wrong
+    """
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "error": "Admin endpoint disabled",
+                "message": "Set ADMIN_API_TOKEN to enable this endpoint"
+            }
+        )
+    if not _has_admin_token(req):
+        raise HTTPException(
+            status_code=401,
+            detail={
+                "error": "Unauthorized",
+                "message": "A valid admin bearer token is required"
+            },
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+def _chat_error_to_http_exception(error_message: str) -> HTTPException:
+    """
+    Map a chat processing error message to an HTTP error response
+    
+    Args:
+        error_message: Error message raised while processing the chat turn
+    
+    Returns:
+        HTTPException with a status code and user-friendly error detail
+    """
+    # Provide more specific error messages
+    if "quota" in error_message.lower() or "billing" in error_message.lower():
+        error_detail = {
+            "error": "OpenAI API Quota Exceeded",
+            "message": "Your OpenAI API quota has been exceeded. Please check your billing and plan at https://platform.openai.com/account/billing",
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "help": "You may need to add credits to your OpenAI account or upgrade your plan."
+        }
+        return HTTPException(status_code=402, detail=error_detail)  # 402 Payment Required
+    elif "deadline exceeded" in error_message.lower():
+        error_detail = {
+            "error": "Request Deadline Exceeded",
+            "message": "The response took longer than the requested deadline. Please try again in a moment.",
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        return HTTPException(status_code=504, detail=error_detail)  # 504 Gateway Timeout
+    elif "invalid" in error_message.lower() or "api key" in error_message.lower():
+        error_detail = {
+            "error": "Invalid API Key",
+            "message": "Your OpenAI API key is invalid. Please check your .env file.",
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        return HTTPException(status_code=401, detail=error_detail)  # 401 Unauthorized
+    else:
+        # Generic error message
+        error_detail = {
+            "error": "Failed to process your request",
+            "message": error_message if len(error_message) < 200 else "Our customer service is temporarily unavailable. Please try again in a moment.",
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        }
+        return HTTPException(status_code=500, detail=error_detail)
+
 
 @router.get("/", summary="API Information")
 async def api_info():
@@ -35,8 +172,26 @@ async def api_info():
         "endpoints": {
             "health": "GET /api/v1/health",
             "chat": "POST /api/v1/chat",
+            "chat_jobs": "POST /api/v1/chat/jobs",
+            "chat_job": "GET /api/v1/chat/jobs/{id}",
             "conversation": "GET /api/v1/conversation/{id}",
-            "clear_conversation": "DELETE /api/v1/conversation/{id}"
+            "clear_conversation": "DELETE /api/v1/conversation/{id}",
+            "export_conversations": "GET /api/v1/conversations/export",
+            "prompt_cache_stats": "GET /api/v1/stats/prompt-cache",
+            "hedging_stats": "GET /api/v1/stats/hedging",
+            "chat_websocket": "WS /api/v1/ws/chat",
+            "disconnect_stats": "GET /api/v1/stats/disconnects",
+            "upstream_pool_stats": "GET /api/v1/stats/upstream-pool",
+            "load_stats": "GET /api/v1/stats/load",
+            "job_stats": "GET /api/v1/stats/jobs",
+            "conversation_stats": "GET /api/v1/stats/conversations",
+            "usage": "GET /api/v1/usage",
+            "idempotency_stats": "GET /api/v1/stats/idempotency",
+            "quota_stats": "GET /api/v1/stats/quota",
+            "llm_backend_stats": "GET /api/v1/stats/llm-backends",
+            "generation_profile_stats": "GET /api/v1/stats/generation-profiles",
+            "turn_pipeline_stats": "GET /api/v1/stats/turn-pipeline",
+            "tracing_stats": "GET /api/v1/stats/tracing"
         },
         "documentation": "/docs"
     }
@@ -58,7 +213,7 @@ async def health_check():
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, req: Request):
+async def chat(request: ChatRequest, req: Request, http_response: Response):
     """
     Main chat endpoint - processes customer messages and returns AI responses
     
@@ -66,10 +221,12 @@ async def chat(request: ChatRequest, req: Request):
     - Maintains conversation context using conversation_id
     - Provides personalized responses when customer_name is provided
     - Returns helpful customer service responses
+    - Replays the original response when retried with the same Idempotency-Key header
     
     Args:
         request: ChatRequest containing the customer's message
         req: FastAPI Request object for client info
+        http_response: Outgoing response, used to return the trace context header
     
     Returns:
         ChatResponse with AI-generated answer, conversation_id, and metadata
@@ -77,6 +234,17 @@ async def chat(request: ChatRequest, req: Request):
     Raises:
         HTTPException: If the request is invalid or OpenAI API call fails
     """
+    # New conversations are low priority when the service is overloaded
+    if not request.conversation_id and load_monitor.should_shed():
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Service overloaded",
+                "message": "The service is busy right now. Please try again in a moment."
+            },
+            headers={"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER_SECONDS)}
+        )
+    
     try:
         # Log incoming request
         client_host = req.client.host if req.client else "unknown"
@@ -86,44 +254,58 @@ async def chat(request: ChatRequest, req: Request):
             f"Message: {request.message[:50]}..."
         )
         
-        # Get or create conversation
-        conversation_id = conversation_manager.get_or_create_conversation(
-            request.conversation_id
-        )
-        
-        # Get conversation history
-        conversation_history = conversation_manager.get_conversation_history_for_openai(
-            conversation_id
-        )
-        
-        # Get AI response
-        ai_response = await openai_service.get_chat_response(
-            user_message=request.message,
-            conversation_history=conversation_history,
-            customer_name=request.customer_name
-        )
-        
-        # Add messages to conversation history
-        conversation_manager.add_message(conversation_id, "user", request.message)
-        conversation_manager.add_message(conversation_id, "assistant", ai_response)
-        
-        # Get message count
-        message_count = conversation_manager.get_message_count(conversation_id)
-        
-        # Generate timestamp
-        current_time = datetime.utcnow().isoformat() + "Z"
-        
-        # Log successful response
-        logger.info(
-            f"Response generated for conversation {conversation_id} - "
-            f"Message count: {message_count}"
+        with tracer.span(
+            "POST /chat",
+            kind=SPAN_KIND_SERVER,
+            traceparent=req.headers.get("traceparent"),
+            **{"http.route": "/chat", "conversation.new": request.conversation_id is None}
+        ) as span, traffic_recorder.record_chat(request, req.headers) as record:
+            if span.sampled:
+                http_response.headers["traceresponse"] = span.traceparent
+            idempotency_key = req.headers.get("Idempotency-Key")
+            if not idempotency_key:
+                response = await turn_pipeline.submit(
+                    message=request.message,
+                    conversation_id=request.conversation_id,
+                    customer_name=request.customer_name,
+                    deadline=_get_request_deadline(req),
+                    is_disconnected=req.is_disconnected
+                )
+            else:
+                # Keyed requests keep running if the client drops, so its retry can pick up the result
+                response = await idempotency_cache.run(
+                    key=idempotency_key,
+                    fingerprint=idempotency_cache.fingerprint(**request.model_dump()),
+                    process=lambda: turn_pipeline.submit(
+                        message=request.message,
+                        conversation_id=request.conversation_id,
+                        customer_name=request.customer_name,
+                        deadline=_get_request_deadline(req)
+                    )
+                )
+            record["conversation_id"] = response.conversation_id
+            span.set_attribute("conversation.id", response.conversation_id)
+            span.set_attribute("chat.merged_messages", response.merged_messages)
+            span.set_attribute("chat.degraded", response.degraded)
+            return response
+    
+    except IdempotencyKeyMismatch as e:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error": "Idempotency key reused",
+                "message": str(e)
+            }
         )
-        
-        return ChatResponse(
-            answer=ai_response,
-            conversation_id=conversation_id,
-            timestamp=current_time,
-            message_count=message_count
+    
+    except ClientDisconnected:
+        logger.info(f"Client {client_host} disconnected before the response was ready")
+        raise HTTPException(
+            status_code=499,  # Client Closed Request
+            detail={
+                "error": "Client disconnected",
+                "message": "The request was cancelled because the client disconnected"
+            }
         )
     
     except Exception as e:
@@ -131,30 +313,198 @@ async def chat(request: ChatRequest, req: Request):
         error_message = str(e)
         logger.error(f"Error processing chat request: {error_message}", exc_info=True)
         
-        # Provide more specific error messages
-        if "quota" in error_message.lower() or "billing" in error_message.lower():
-            error_detail = {
-                "error": "OpenAI API Quota Exceeded",
-                "message": "Your OpenAI API quota has been exceeded. Please check your billing and plan at https://platform.openai.com/account/billing",
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "help": "You may need to add credits to your OpenAI account or upgrade your plan."
-            }
-            raise HTTPException(status_code=402, detail=error_detail)  # 402 Payment Required
-        elif "invalid" in error_message.lower() or "api key" in error_message.lower():
-            error_detail = {
-                "error": "Invalid API Key",
-                "message": "Your OpenAI API key is invalid. Please check your .env file.",
-                "timestamp": datetime.utcnow().isoformat() + "Z"
+        raise _chat_error_to_http_exception(error_message)
+
+
+@router.post("/chat/jobs", response_model=ChatJob, status_code=202)
+async def create_chat_job(request: ChatJobRequest):
+    """
+    Queue a chat message for asynchronous processing
+    
+    Returns immediately with a job ID. The result can be polled with
+    GET /chat/jobs/{job_id} or delivered to the optional webhook_url.
+    
+    Args:
+        request: ChatJobRequest containing the message and optional webhook URL
+    
+    Returns:
+        The queued ChatJob
+    
+    Raises:
+        HTTPException: If the webhook URL is not allowed or the job queue is full
+    """
+    try:
+        job = await chat_job_queue.submit(request)
+    except WebhookNotAllowed as e:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "error": "Webhook not allowed",
+                "message": str(e)
             }
-            raise HTTPException(status_code=401, detail=error_detail)  # 401 Unauthorized
-        else:
-            # Generic error message
-            error_detail = {
-                "error": "Failed to process your request",
-                "message": error_message if len(error_message) < 200 else "Our customer service is temporarily unavailable. Please try again in a moment.",
-                "timestamp": datetime.utcnow().isoformat() + "Z"
+        )
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Job queue full",
+                "message": "Too many queued requests. Please try again later."
+            },
+            headers={"Retry-After": str(settings.LOAD_SHED_RETRY_AFTER_SECONDS)}
+        )
+    
+    logger.info(f"Chat job {job.job_id} queued - Conversation: {request.conversation_id or 'new'}")
+    return job
+
+
+@router.get("/chat/jobs/{job_id}", response_model=ChatJob)
+async def get_chat_job(job_id: str):
+    """
+    Get the status and result of an asynchronous chat job
+    
+    Args:
+        job_id: The job ID returned by POST /chat/jobs
+    
+    Returns:
+        ChatJob with status, and result or error once finished
+    
+    Raises:
+        HTTPException: If the job is not found
+    """
+    job = chat_job_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "Job not found",
+                "message": f"Job {job_id} does not exist or its result has expired"
             }
-            raise HTTPException(status_code=500, detail=error_detail)
+        )
+    return job
+
+
+@router.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """
+    WebSocket chat channel - keeps one conversation open and streams answers
+    
+    The conversation is created on the first message (or resumed from the
+    `conversation_id` query parameter) and stays bound to the connection for
+    all following turns, so sockets that never send anything cost no state.
+    
+    Protocol:
+    - Server sends `{"type": "session", "conversation_id": ...}` once the
+      conversation is known: on connect when resuming, else on the first message
+    - Client sends `{"message": ..., "customer_name": optional}` per turn
+    - Server streams `{"type": "token", "content": ...}` chunks, then
+      `{"type": "done", "answer", "conversation_id", "timestamp", "message_count"}`
+    - Errors are sent as `{"type": "error", "status_code": ..., "detail": {...}}`
+    
+    Args:
+        websocket: FastAPI WebSocket connection
+    """
+    await websocket.accept()
+    
+    requested_id = websocket.query_params.get("conversation_id")
+    # New conversations are low priority when the service is overloaded
+    if not requested_id and load_monitor.should_shed():
+        try:
+            await websocket.send_json({
+                "type": "error",
+                "status_code": 503,
+                "detail": {
+                    "error": "Service overloaded",
+                    "message": "The service is busy right now. Please try again in a moment."
+                }
+            })
+            # 1013: try again later
+            await websocket.close(code=1013)
+        except WEBSOCKET_CLOSED:
+            pass
+        return
+    
+    conversation_id = requested_id if requested_id in conversation_manager.conversations else None
+    customer_name = websocket.query_params.get("customer_name")
+    client_host = websocket.client.host if websocket.client else "unknown"
+    logger.info(f"WebSocket session opened from {client_host} - Conversation: {conversation_id}")
+    
+    try:
+        if conversation_id:
+            await websocket.send_json({"type": "session", "conversation_id": conversation_id})
+        
+        while True:
+            try:
+                data = await websocket.receive_json()
+                if not isinstance(data, dict):
+                    data = {}
+                request = ChatRequest(
+                    message=data.get("message", ""),
+                    conversation_id=conversation_id,
+                    customer_name=data.get("customer_name", customer_name)
+                )
+            except (ValidationError, ValueError) as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "status_code": 422,
+                    "detail": {"error": "Invalid message", "message": str(e)}
+                })
+                continue
+            
+            try:
+                # Created (or replaced, if it expired meanwhile) only once there is a message to answer
+                resolved_id = conversation_manager.get_or_create_conversation(conversation_id)
+                if resolved_id != conversation_id:
+                    conversation_id = resolved_id
+                    await websocket.send_json({"type": "session", "conversation_id": conversation_id})
+                
+                # Holds the conversation's turn slot so HTTP turns of the same conversation wait
+                async with turn_pipeline.exclusive(conversation_id):
+                    conversation_history = conversation_manager.get_conversation_history_for_openai(
+                        conversation_id
+                    )
+                    
+                    chunks = []
+                    stream = openai_service.stream_chat_response(
+                        user_message=request.message,
+                        conversation_history=conversation_history,
+                        customer_name=request.customer_name
+                    )
+                    async with aclosing(stream):
+                        try:
+                            async for chunk in stream:
+                                chunks.append(chunk)
+                                await websocket.send_json({"type": "token", "content": chunk})
+                        except WEBSOCKET_CLOSED:
+                            # Closing the stream cancels the upstream generation
+                            disconnect_monitor.record_abandoned(tokens_already_generated=len(chunks))
+                            raise
+                    
+                    ai_response = "".join(chunks).strip()
+                    conversation_manager.add_message(conversation_id, "user", request.message)
+                    conversation_manager.add_message(conversation_id, "assistant", ai_response)
+                    conversation_summarizer.maybe_schedule(conversation_id)
+                
+                await websocket.send_json({
+                    "type": "done",
+                    "answer": ai_response,
+                    "conversation_id": conversation_id,
+                    "timestamp": datetime.utcnow().isoformat() + "Z",
+                    "message_count": conversation_manager.get_message_count(conversation_id)
+                })
+            
+            except WEBSOCKET_CLOSED:
+                raise
+            except Exception as e:
+                logger.error(f"Error processing WebSocket chat message: {str(e)}", exc_info=True)
+                error = _chat_error_to_http_exception(str(e))
+                await websocket.send_json({
+                    "type": "error",
+                    "status_code": error.status_code,
+                    "detail": error.detail
+                })
+    
+    except WEBSOCKET_CLOSED:
+        logger.info(f"WebSocket session closed - Conversation: {conversation_id}")
 
 
 @router.get("/conversation/{conversation_id}", response_model=ConversationHistory)
@@ -186,12 +536,57 @@ async def get_conversation_history(conversation_id: str):
     return ConversationHistory(
         conversation_id=conversation_id,
         messages=messages,
+        summary=conv_data.get("summary"),
+        usage=conv_data.get("usage"),
         created_at=conv_data["created_at"].isoformat() + "Z",
         last_updated=conv_data["last_updated"].isoformat() + "Z",
         message_count=len(messages)
     )
 
 
+@router.get("/conversations/export", dependencies=[Depends(_require_admin)])
+async def export_conversations(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """
+    Stream all stored conversations as NDJSON (one conversation per line)
+    
+    Requires the ADMIN_API_TOKEN as a bearer token. Conversations are serialized one at a time while the response is being
+    sent, and the event loop is released between batches so large exports
+    don't hold up chat requests.
+    
+    Args:
+        since: Only include conversations updated at or after this time (ISO 8601)
+        until: Only include conversations created at or before this time (ISO 8601)
+    
+    Returns:
+        Streaming application/x-ndjson response
+    """
+    # Conversation timestamps are stored as naive local times
+    if since and since.tzinfo:
+        since = since.astimezone().replace(tzinfo=None)
+    if until and until.tzinfo:
+        until = until.astimezone().replace(tzinfo=None)
+    
+    async def generate():
+        batch = []
+        for record in conversation_manager.iter_conversations(since=since, until=until):
+            batch.append(json.dumps(record) + "\n")
+            if len(batch) >= settings.EXPORT_BATCH_SIZE:
+                yield "".join(batch)
+                batch = []
+                await asyncio.sleep(0)
+        if batch:
+            yield "".join(batch)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=conversations.ndjson"}
+    )
+
+
 @router.delete("/conversation/{conversation_id}")
 async def clear_conversation(conversation_id: str):
     """
@@ -217,3 +612,167 @@ async def clear_conversation(conversation_id: str):
             }
         )
 
+
+@router.get("/stats/prompt-cache")
+async def prompt_cache_stats():
+    """
+    Get provider-side prompt cache statistics
+    
+    Returns:
+        Prompt and cached token totals with request and token hit rates
+    """
+    return prompt_builder.get_stats()
+
+
+@router.get("/stats/hedging")
+async def hedging_stats():
+    """
+    Get hedged request and deadline statistics
+    
+    Returns:
+        Hedge rate, hedge win rate, capped hedges and current hedge delay
+    """
+    return hedging_policy.get_stats()
+
+
+@router.get("/stats/disconnects")
+async def disconnect_stats():
+    """
+    Get statistics on requests abandoned by disconnected clients
+    
+    Returns:
+        Abandoned request count and estimated completion tokens saved
+    """
+    return disconnect_monitor.get_stats()
+
+
+@router.get("/stats/upstream-pool")
+async def upstream_pool_stats():
+    """
+    Get upstream HTTP connection pool utilization
+    
+    Returns:
+        Pool limits, open/active/idle connections and pre-warmed connection count
+    """
+    return upstream_pool.get_stats()
+
+
+@router.get("/stats/load")
+async def load_stats():
+    """
+    Get event-loop lag, in-flight requests and load shedding statistics
+    
+    Returns:
+        Current lag, in-flight request count and number of shed requests
+    """
+    return load_monitor.get_stats()
+
+
+@router.get("/stats/jobs")
+async def job_stats():
+    """
+    Get asynchronous chat job queue statistics
+    
+    Returns:
+        Queue depth, worker count and completed/failed/rejected job counts
+    """
+    return chat_job_queue.get_stats()
+
+
+@router.get("/stats/conversations")
+async def conversation_stats():
+    """
+    Get conversation store memory statistics
+    
+    Returns:
+        Conversation count, approximate bytes used, memory budget and LRU evictions
+    """
+    return conversation_manager.get_stats()
+
+
+@router.get("/stats/idempotency")
+async def idempotency_stats():
+    """
+    Get Idempotency-Key statistics
+    
+    Returns:
+        Stored responses, in-flight keyed requests, replays and attached retries
+    """
+    return idempotency_cache.get_stats()
+
+
+@router.get("/stats/quota")
+async def quota_stats():
+    """
+    Get OpenAI quota state
+    
+    Returns:
+        Whether the quota is exhausted, time to the next recovery check and skipped calls
+    """
+    return quota_guard.get_stats()
+
+
+@router.get("/stats/llm-backends")
+async def llm_backend_stats():
+    """
+    Get LLM backend routing statistics
+    
+    Returns:
+        Routing rules, fallbacks and per-backend availability, calls and failures
+    """
+    return llm_router.get_stats()
+
+
+@router.get("/stats/generation-profiles")
+async def generation_profile_stats():
+    """
+    Get intent-aware generation profile statistics
+    
+    Returns:
+        Limits per profile with the recent output-length distribution and a suggested max_tokens
+    """
+    return generation_profiles.get_stats()
+
+
+@router.get("/stats/turn-pipeline")
+async def turn_pipeline_stats():
+    """
+    Get per-conversation turn pipeline statistics
+    
+    Returns:
+        Active conversations, queued messages and how many messages were merged into shared turns
+    """
+    return turn_pipeline.get_stats()
+
+
+@router.get("/stats/tracing")
+async def tracing_stats():
+    """
+    Get tracing statistics
+    
+    Returns:
+        Sampled traces and how many spans were exported, queued or dropped
+    """
+    return tracer.get_stats()
+
+
+@router.get("/usage")
+async def usage_report(req: Request, top: int = 10):
+    """
+    Get aggregate token usage and cost estimates
+    
+    Top conversations are only included for admin requests, since each
+    conversation ID gives access to that conversation's history.
+    
+    Args:
+        req: FastAPI Request object
+        top: Number of highest-usage conversations to include
+    
+    Returns:
+        Token totals and estimated cost overall and per model, plus top conversations for admins
+    """
+    if not _has_admin_token(req):
+        report = conversation_manager.get_usage_report(top_n=0)
+        del report["top_conversations"]
+        return report
+    return conversation_manager.get_usage_report(top_n=min(max(top, 0), 100))
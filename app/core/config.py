@@ -2,8 +2,9 @@
 Configuration settings for the Customer Service Chatbot API
 """
 
+import json
 import os
-from typing import List
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,6 +25,96 @@ class Settings:
     OPENAI_TEMPERATURE: float = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
     OPENAI_MAX_TOKENS: int = int(os.getenv("OPENAI_MAX_TOKENS", "500"))
     
+    # Token Prices for cost estimates (USD per million tokens, JSON keyed by model name prefix)
+    TOKEN_PRICES: Dict[str, Dict[str, float]] = json.loads(os.getenv("TOKEN_PRICES", json.dumps({
+        "gpt-3.5-turbo": {"prompt": 0.5, "completion": 1.5},
+        "gpt-4o-mini": {"prompt": 0.15, "cached": 0.075, "completion": 0.6},
+        "gpt-4o": {"prompt": 2.5, "cached": 1.25, "completion": 10.0},
+        "gpt-4-turbo": {"prompt": 10.0, "completion": 30.0},
+        "gpt-4": {"prompt": 30.0, "completion": 60.0}
+    })))
+    
+    # Intent-Aware Generation Profiles (JSON overrides, e.g. {"smalltalk": {"max_tokens": 60}})
+    GENERATION_PROFILES_ENABLED: bool = os.getenv("GENERATION_PROFILES_ENABLED", "true").lower() == "true"
+    GENERATION_PROFILES: Dict[str, Dict[str, Any]] = json.loads(os.getenv("GENERATION_PROFILES", "{}"))
+    GENERATION_STATS_WINDOW: int = int(os.getenv("GENERATION_STATS_WINDOW", "1000"))
+    
+    # LLM Backends & Routing
+    LOCAL_LLM_URL: str = os.getenv("LOCAL_LLM_URL", "")  # OpenAI-compatible server, e.g. http://localhost:8080/v1
+    LOCAL_LLM_MODEL: str = os.getenv("LOCAL_LLM_MODEL", "local-model")
+    LOCAL_LLM_API_KEY: str = os.getenv("LOCAL_LLM_API_KEY", "not-needed")
+    CPU_MODEL_PATH: str = os.getenv("CPU_MODEL_PATH", "")  # GGUF file served in-process by llama-cpp-python
+    CPU_MODEL_WORKERS: int = int(os.getenv("CPU_MODEL_WORKERS", "1"))
+    CPU_MODEL_CONTEXT_TOKENS: int = int(os.getenv("CPU_MODEL_CONTEXT_TOKENS", "4096"))
+    CPU_MODEL_THREADS: int = int(os.getenv("CPU_MODEL_THREADS", "0"))
+    LLM_DEFAULT_BACKEND: str = os.getenv("LLM_DEFAULT_BACKEND", "openai")
+    LLM_SIMPLE_BACKEND: str = os.getenv("LLM_SIMPLE_BACKEND", "")
+    LLM_SIMPLE_MAX_CHARS: int = int(os.getenv("LLM_SIMPLE_MAX_CHARS", "200"))
+    LLM_SIMPLE_MAX_HISTORY: int = int(os.getenv("LLM_SIMPLE_MAX_HISTORY", "4"))
+    LLM_SUMMARY_BACKEND: str = os.getenv("LLM_SUMMARY_BACKEND", "")
+    LLM_FALLBACK_TO_DEFAULT: bool = os.getenv("LLM_FALLBACK_TO_DEFAULT", "true").lower() == "true"
+    
+    # Request Deadlines & Hedging
+    REQUEST_DEADLINE_SECONDS: float = float(os.getenv("REQUEST_DEADLINE_SECONDS", "30"))
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+    HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "2.0"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    HEDGE_LATENCY_WINDOW: int = int(os.getenv("HEDGE_LATENCY_WINDOW", "500"))
+    HEDGE_MAX_RATIO: float = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+    HEDGE_FALLBACK_MODEL: str = os.getenv("HEDGE_FALLBACK_MODEL", "")
+    
+    # Upstream HTTP Connection Pool
+    UPSTREAM_MAX_CONCURRENCY: int = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "100"))
+    UPSTREAM_KEEPALIVE_EXPIRY_SECONDS: float = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY_SECONDS", "60"))
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT_SECONDS", "5"))
+    UPSTREAM_HTTP2: bool = os.getenv("UPSTREAM_HTTP2", "true").lower() == "true"
+    UPSTREAM_PREWARM_CONNECTIONS: int = int(os.getenv("UPSTREAM_PREWARM_CONNECTIONS", "4"))
+    UPSTREAM_PREWARM_TIMEOUT_SECONDS: float = float(os.getenv("UPSTREAM_PREWARM_TIMEOUT_SECONDS", "5"))
+    
+    # Event-Loop Lag Monitoring & Load Shedding
+    LOAD_SHEDDING_ENABLED: bool = os.getenv("LOAD_SHEDDING_ENABLED", "true").lower() == "true"
+    LOAD_MONITOR_INTERVAL_SECONDS: float = float(os.getenv("LOAD_MONITOR_INTERVAL_SECONDS", "0.1"))
+    LOAD_SHED_LAG_MS: float = float(os.getenv("LOAD_SHED_LAG_MS", "100"))
+    LOAD_SHED_MAX_IN_FLIGHT: int = int(os.getenv("LOAD_SHED_MAX_IN_FLIGHT", "200"))
+    LOAD_SHED_RETRY_AFTER_SECONDS: int = int(os.getenv("LOAD_SHED_RETRY_AFTER_SECONDS", "2"))
+    
+    # Asynchronous Chat Jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_MAX_SIZE: int = int(os.getenv("JOB_QUEUE_MAX_SIZE", "1000"))
+    JOB_STORE_FILE: str = os.getenv("JOB_STORE_FILE", "chat_jobs.jsonl")
+    JOB_RESULT_TTL_MINUTES: int = int(os.getenv("JOB_RESULT_TTL_MINUTES", "60"))
+    JOB_WEBHOOK_TIMEOUT_SECONDS: float = float(os.getenv("JOB_WEBHOOK_TIMEOUT_SECONDS", "10"))
+    JOB_WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("JOB_WEBHOOK_MAX_ATTEMPTS", "3"))
+    # Hosts webhook_url may point to (comma-separated); webhooks are rejected while this is empty
+    JOB_WEBHOOK_ALLOWED_HOSTS: List[str] = [
+        host.strip().lower() for host in os.getenv("JOB_WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()
+    ]
+    
+    # Client Disconnect Detection
+    DISCONNECT_POLL_INTERVAL_SECONDS: float = float(os.getenv("DISCONNECT_POLL_INTERVAL_SECONDS", "0.25"))
+    
+    # Per-Conversation Turn Pipeline (messages sent while a turn is in flight share the next turn)
+    TURN_MERGE_ENABLED: bool = os.getenv("TURN_MERGE_ENABLED", "true").lower() == "true"
+    TURN_MERGE_MAX_MESSAGES: int = int(os.getenv("TURN_MERGE_MAX_MESSAGES", "5"))
+    
+    # Quota Exhaustion Fast-Fail
+    QUOTA_COOLDOWN_SECONDS: float = float(os.getenv("QUOTA_COOLDOWN_SECONDS", "60"))
+    QUOTA_PROBE_MAX_INTERVAL_SECONDS: float = float(os.getenv("QUOTA_PROBE_MAX_INTERVAL_SECONDS", "600"))
+    QUOTA_DEGRADED_FALLBACK: bool = os.getenv("QUOTA_DEGRADED_FALLBACK", "true").lower() == "true"
+    
+    # Traffic Recording (opt-in capture of /chat traffic for offline replay)
+    RECORD_TRAFFIC: bool = os.getenv("RECORD_TRAFFIC", "false").lower() == "true"
+    RECORD_FILE: str = os.getenv("RECORD_FILE", "traffic_recording.jsonl")
+    RECORD_REDACT_PII: bool = os.getenv("RECORD_REDACT_PII", "true").lower() == "true"
+    
+    # Idempotency Keys
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+    
+    # Admin Endpoints (conversation export, per-conversation usage); disabled while unset
+    ADMIN_API_TOKEN: str = os.getenv("ADMIN_API_TOKEN", "")
+    
     # CORS Configuration
     CORS_ORIGINS: List[str] = ["*"]  # In production, specify your frontend domains
     
@@ -33,12 +124,32 @@ class Settings:
     
     # Conversation Settings
     MAX_CONVERSATION_HISTORY: int = int(os.getenv("MAX_CONVERSATION_HISTORY", "10"))
+    HISTORY_TRIM_BLOCK_MESSAGES: int = int(os.getenv("HISTORY_TRIM_BLOCK_MESSAGES", "6"))
     CONVERSATION_TIMEOUT_MINUTES: int = int(os.getenv("CONVERSATION_TIMEOUT_MINUTES", "30"))
+    CONVERSATION_MEMORY_BUDGET_MB: int = int(os.getenv("CONVERSATION_MEMORY_BUDGET_MB", "256"))
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "100"))
+    
+    # Conversation Summarization
+    SUMMARY_ENABLED: bool = os.getenv("SUMMARY_ENABLED", "true").lower() == "true"
+    SUMMARY_TRIGGER_MESSAGES: int = int(os.getenv("SUMMARY_TRIGGER_MESSAGES", "16"))
+    SUMMARY_KEEP_RECENT_MESSAGES: int = int(os.getenv("SUMMARY_KEEP_RECENT_MESSAGES", "6"))
+    SUMMARY_MAX_TOKENS: int = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+    SUMMARY_RETRY_COOLDOWN_SECONDS: float = float(os.getenv("SUMMARY_RETRY_COOLDOWN_SECONDS", "300"))
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "chatbot.log")
     
+    # Tracing (OTLP/JSON spans, appended to a file or POSTed to a collector's /v1/traces)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_EXPORT_FILE: str = os.getenv("TRACE_EXPORT_FILE", "traces.jsonl")
+    TRACE_EXPORT_ENDPOINT: str = os.getenv("TRACE_EXPORT_ENDPOINT", "")
+    TRACE_EXPORT_BATCH_SIZE: int = int(os.getenv("TRACE_EXPORT_BATCH_SIZE", "512"))
+    TRACE_EXPORT_INTERVAL_SECONDS: float = float(os.getenv("TRACE_EXPORT_INTERVAL_SECONDS", "5"))
+    TRACE_MAX_QUEUE_SIZE: int = int(os.getenv("TRACE_MAX_QUEUE_SIZE", "10000"))
+    TRACE_SERVICE_NAME: str = os.getenv("TRACE_SERVICE_NAME", "customer-service-chatbot")
+    
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
@@ -0,0 +1,130 @@
+"""
+Shared, tuned HTTP connection pool for upstream (OpenAI) API calls
+"""
+
+import asyncio
+import logging
+import math
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamHttpPool:
+    """Owns the single httpx client used for every upstream call"""
+    
+    def __init__(self):
+        # Room for hedged requests on top of the normal upstream concurrency
+        self.max_connections = math.ceil(
+            settings.UPSTREAM_MAX_CONCURRENCY * (1 + settings.HEDGE_MAX_RATIO)
+        )
+        self.max_keepalive_connections = settings.UPSTREAM_MAX_CONCURRENCY
+        self.keepalive_expiry = settings.UPSTREAM_KEEPALIVE_EXPIRY_SECONDS
+        self.http2 = settings.UPSTREAM_HTTP2
+        self.prewarm_connections = min(settings.UPSTREAM_PREWARM_CONNECTIONS, self.max_connections)
+        self.prewarmed = 0
+        self._client = None
+    
+    @property
+    def client(self):
+        """The shared httpx.AsyncClient, created on first use"""
+        if self._client is None:
+            import httpx
+            
+            http2 = self.http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("h2 not installed, upstream HTTP/2 disabled (pip install httpx[http2])")
+                    http2 = False
+            
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(
+                    settings.REQUEST_DEADLINE_SECONDS,
+                    connect=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS
+                ),
+                follow_redirects=True
+            )
+            logger.info(
+                f"Upstream HTTP pool created - max connections: {self.max_connections}, "
+                f"keep-alive: {self.max_keepalive_connections}, HTTP/2: {http2}"
+            )
+        return self._client
+    
+    async def prewarm(self, url: str, headers: Optional[Dict[str, str]] = None) -> int:
+        """
+        Open keep-alive connections ahead of the first real requests
+        
+        Pays DNS/TCP/TLS setup at startup instead of on the first customer requests.
+        Any HTTP response (even an error status) leaves a warm connection behind.
+        
+        Args:
+            url: Lightweight upstream URL to request
+            headers: Optional request headers (e.g. authorization)
+        
+        Returns:
+            Number of connections successfully warmed
+        """
+        if self.prewarm_connections <= 0:
+            return 0
+        
+        async def warm_one() -> bool:
+            try:
+                await self.client.get(url, headers=headers)
+                return True
+            except Exception as e:
+                logger.warning(f"Upstream connection pre-warm failed: {str(e)}")
+                return False
+        
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(warm_one() for _ in range(self.prewarm_connections))),
+                timeout=settings.UPSTREAM_PREWARM_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.warning("Upstream connection pre-warm timed out")
+            return 0
+        
+        self.prewarmed = sum(results)
+        logger.info(f"Pre-warmed {self.prewarmed} upstream connections")
+        return self.prewarmed
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get connection pool utilization statistics"""
+        connections = []
+        if self._client is not None:
+            pool = getattr(self._client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+        
+        open_connections = len(connections)
+        idle_connections = sum(1 for conn in connections if conn.is_idle())
+        active_connections = open_connections - idle_connections
+        
+        return {
+            "initialized": self._client is not None,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "open_connections": open_connections,
+            "active_connections": active_connections,
+            "idle_connections": idle_connections,
+            "utilization": active_connections / self.max_connections if self.max_connections else 0.0,
+            "prewarmed_connections": self.prewarmed
+        }
+    
+    async def close(self) -> None:
+        """Close all pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Global upstream HTTP pool instance
+upstream_pool = UpstreamHttpPool()
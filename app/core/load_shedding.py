@@ -0,0 +1,147 @@
+"""
+Event-loop lag monitoring and admission control that sheds low-priority work under load
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Path prefixes that are shed first when the service is overloaded
+LOW_PRIORITY_PREFIXES = (
+    f"{settings.API_PREFIX}/conversation/",
+    f"{settings.API_PREFIX}/conversations/",
+    "/demo",
+    "/static/",
+    "/docs",
+    "/redoc",
+    "/openapi.json",
+)
+
+
+class LoadMonitor:
+    """Tracks event-loop lag and in-flight requests in the background"""
+    
+    def __init__(self):
+        self.enabled = settings.LOAD_SHEDDING_ENABLED
+        self.interval = settings.LOAD_MONITOR_INTERVAL_SECONDS
+        self.max_lag = settings.LOAD_SHED_LAG_MS / 1000
+        self.max_in_flight = settings.LOAD_SHED_MAX_IN_FLIGHT
+        
+        self.lag = 0.0
+        self.max_observed_lag = 0.0
+        self.in_flight = 0
+        self.shed_requests = 0
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _monitor(self) -> None:
+        """Measure how late the loop wakes up from a fixed-interval sleep"""
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            # Smooth out single spikes while still reacting within a few intervals
+            self.lag = 0.5 * self.lag + 0.5 * lag
+            self.max_observed_lag = max(self.max_observed_lag, lag)
+    
+    def start(self) -> None:
+        """Start the background lag monitor"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._monitor())
+            logger.info(
+                f"Load shedding enabled - lag threshold: {self.max_lag * 1000:.0f}ms, "
+                f"max in-flight: {self.max_in_flight}"
+            )
+    
+    async def stop(self) -> None:
+        """Stop the background lag monitor"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def is_overloaded(self) -> bool:
+        """Check whether lag or queue depth is past its threshold"""
+        if not self.enabled:
+            return False
+        return self.lag > self.max_lag or self.in_flight > self.max_in_flight
+    
+    def should_shed(self) -> bool:
+        """
+        Decide whether a low-priority request should be rejected now
+        
+        Returns:
+            True if the request should get a fast 503
+        """
+        if self.is_overloaded():
+            self.shed_requests += 1
+            return True
+        return False
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get event-loop lag and load shedding statistics"""
+        return {
+            "enabled": self.enabled,
+            "overloaded": self.is_overloaded(),
+            "event_loop_lag_ms": round(self.lag * 1000, 2),
+            "max_event_loop_lag_ms": round(self.max_observed_lag * 1000, 2),
+            "in_flight_requests": self.in_flight,
+            "shed_requests": self.shed_requests,
+            "lag_threshold_ms": self.max_lag * 1000,
+            "max_in_flight": self.max_in_flight
+        }
+
+
+SHED_RESPONSE_BODY = json.dumps({
+    "detail": {
+        "error": "Service overloaded",
+        "message": "The service is busy right now. Please try again in a moment."
+    }
+}).encode()
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware that counts in-flight requests and sheds low-priority ones"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if scope["path"].startswith(LOW_PRIORITY_PREFIXES) and load_monitor.should_shed():
+            await send_overloaded_response(send)
+            return
+        
+        load_monitor.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            load_monitor.in_flight -= 1
+
+
+async def send_overloaded_response(send) -> None:
+    """Send a fast 503 response with a Retry-After hint"""
+    await send({
+        "type": "http.response.start",
+        "status": 503,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(SHED_RESPONSE_BODY)).encode()),
+            (b"retry-after", str(settings.LOAD_SHED_RETRY_AFTER_SECONDS).encode())
+        ]
+    })
+    await send({"type": "http.response.body", "body": SHED_RESPONSE_BODY})
+
+
+# Global load monitor instance
+load_monitor = LoadMonitor()
@@ -0,0 +1,331 @@
+"""
+Lightweight span-based tracing with head sampling and a batched background exporter
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# OTLP status codes
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """A timed operation within a trace"""
+    
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind", "sampled",
+        "attributes", "start_ns", "end_ns", "status", "status_message"
+    )
+    
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.status = STATUS_OK
+        self.status_message = ""
+    
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Set an attribute (ignored for spans that are not sampled)"""
+        if self.sampled and value is not None:
+            self.attributes[key] = value
+    
+    def increment(self, key: str, amount: int = 1) -> None:
+        """Add to a numeric attribute"""
+        if self.sampled:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+    
+    def record_exception(self, e: BaseException) -> None:
+        """Mark the span as failed"""
+        self.status = STATUS_ERROR
+        self.status_message = str(e)[:200]
+        self.set_attribute("exception.type", type(e).__name__)
+    
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value for this span"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+    
+    def to_otlp(self) -> Dict[str, Any]:
+        """Convert to an OTLP/JSON span"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    """Convert an attribute to an OTLP/JSON key-value pair"""
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+# Span of the operation running in the current context
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+# Returned when tracing is disabled so instrumented code needs no checks
+NOOP_SPAN = Span("noop", trace_id="0" * 32, parent_id=None, sampled=False)
+
+
+class Tracer:
+    """Creates spans, samples traces at the root and exports finished spans in batches"""
+    
+    def __init__(self):
+        self.enabled = settings.TRACING_ENABLED
+        self.sample_rate = settings.TRACE_SAMPLE_RATE
+        self.export_file = settings.TRACE_EXPORT_FILE
+        self.export_endpoint = settings.TRACE_EXPORT_ENDPOINT
+        self.batch_size = settings.TRACE_EXPORT_BATCH_SIZE
+        self.interval = settings.TRACE_EXPORT_INTERVAL_SECONDS
+        self.resource = {
+            "attributes": [
+                _otlp_attribute("service.name", settings.TRACE_SERVICE_NAME),
+                _otlp_attribute("service.instance.id", f"{socket.gethostname()}:{os.getpid()}")
+            ]
+        }
+        
+        self._queue: Deque[Span] = deque(maxlen=settings.TRACE_MAX_QUEUE_SIZE)
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._client = None
+        
+        self.sampled_traces = 0
+        self.unsampled_traces = 0
+        self.exported_spans = 0
+        self.dropped_spans = 0
+        self.export_errors = 0
+    
+    def current_span(self) -> Span:
+        """Get the span of the current operation (a no-op span outside any trace)"""
+        return _current_span.get() or NOOP_SPAN
+    
+    def _parse_traceparent(self, header: Optional[str]) -> Optional[tuple]:
+        """Read (trace_id, parent_id, sampled) from a W3C traceparent header"""
+        if not header:
+            return None
+        parts = header.strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or parts[1] == "0" * 32:
+            return None
+        try:
+            int(parts[1], 16)
+            int(parts[2], 16)
+            flags = int(parts[3], 16)
+        except ValueError:
+            return None
+        return parts[1], parts[2], bool(flags & 1)
+    
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        traceparent: Optional[str] = None,
+        root: bool = False,
+        **attributes: Any
+    ) -> Iterator[Span]:
+        """
+        Time an operation as a child of the current span, or as a new trace root
+        
+        Roots make the sampling decision for the whole trace: an incoming
+        traceparent header is followed, otherwise TRACE_SAMPLE_RATE applies.
+        
+        Args:
+            name: Span name
+            kind: OTLP span kind
+            traceparent: Incoming W3C traceparent header (root spans only)
+            root: Start a new trace even inside another span (e.g. for background work)
+            **attributes: Initial span attributes
+        
+        Yields:
+            The span
+        """
+        if not self.enabled:
+            yield NOOP_SPAN
+            return
+        
+        parent = None if root else _current_span.get()
+        if parent is not None:
+            span = Span(name, parent.trace_id, parent.span_id, parent.sampled, kind)
+        else:
+            remote = self._parse_traceparent(traceparent)
+            if remote is not None:
+                trace_id, parent_id, sampled = remote
+            else:
+                trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+                sampled = random.random() < self.sample_rate
+            span = Span(name, trace_id, parent_id, sampled, kind)
+            if sampled:
+                self.sampled_traces += 1
+            else:
+                self.unsampled_traces += 1
+        
+        if span.sampled:
+            span.attributes.update({key: value for key, value in attributes.items() if value is not None})
+        
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            if span.sampled:
+                self._enqueue(span)
+    
+    @contextmanager
+    def use_span(self, span: Span) -> Iterator[Span]:
+        """Make an existing span the parent of spans created in this block (e.g. in a worker task)"""
+        token = _current_span.set(span if span is not NOOP_SPAN else None)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+    
+    def _enqueue(self, span: Span) -> None:
+        """Queue a finished span for export (the oldest span is dropped when the queue is full)"""
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped_spans += 1
+        self._queue.append(span)
+        if self._batch_ready is not None and len(self._queue) >= self.batch_size:
+            self._batch_ready.set()
+    
+    async def start(self) -> None:
+        """Start the background exporter"""
+        if self.enabled and self._task is None:
+            self._batch_ready = asyncio.Event()
+            self._task = asyncio.create_task(self._export_loop())
+            logger.info(
+                f"Tracing enabled - sample rate: {self.sample_rate}, "
+                f"export: {self.export_endpoint or self.export_file}"
+            )
+    
+    async def stop(self) -> None:
+        """Stop the background exporter and flush the remaining spans"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            await self._flush()
+        
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _export_loop(self) -> None:
+        """Export queued spans every interval, or sooner once a full batch is waiting"""
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+            await self._flush()
+    
+    async def _flush(self) -> None:
+        """Export everything queued, one batch at a time"""
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            try:
+                await self._export(batch)
+                self.exported_spans += len(batch)
+            except Exception as e:
+                self.export_errors += 1
+                self.dropped_spans += len(batch)
+                logger.warning(f"Exporting {len(batch)} spans failed: {str(e)}")
+    
+    async def _export(self, batch: List[Span]) -> None:
+        """Send a batch of spans to the collector endpoint or append it to the trace file"""
+        payload = {
+            "resourceSpans": [{
+                "resource": self.resource,
+                "scopeSpans": [{
+                    "scope": {"name": "app"},
+                    "spans": [span.to_otlp() for span in batch]
+                }]
+            }]
+        }
+        
+        if self.export_endpoint:
+            if self._client is None:
+                import httpx
+                self._client = httpx.AsyncClient(timeout=10)
+            response = await self._client.post(self.export_endpoint, json=payload)
+            response.raise_for_status()
+        else:
+            # One OTLP/JSON batch per line; written off the event loop
+            await asyncio.to_thread(self._append, json.dumps(payload, separators=(",", ":")) + "\n")
+    
+    def _append(self, line: str) -> None:
+        """Append a line to the trace file"""
+        with open(self.export_file, "a", encoding="utf-8") as f:
+            f.write(line)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracing and export statistics"""
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "export": self.export_endpoint or self.export_file,
+            "sampled_traces": self.sampled_traces,
+            "unsampled_traces": self.unsampled_traces,
+            "queued_spans": len(self._queue),
+            "exported_spans": self.exported_spans,
+            "dropped_spans": self.dropped_spans,
+            "export_errors": self.export_errors
+        }
+
+
+# Global tracer instance
+tracer = Tracer()
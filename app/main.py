@@ -12,9 +12,18 @@ from app.core.config import settings
 from app.core.logging_config import setup_logging
 from app.api.routes import router
 from app.services.conversation_manager import conversation_manager
-
-# Setup logging
-logger = setup_logging()
+from app.services.summarizer import conversation_summarizer
+from app.services.openai_service import openai_service
+from app.services.chat_jobs import chat_job_queue
+from app.services.quota_guard import quota_guard
+from app.services.llm_backends import llm_router
+from app.services.traffic_recorder import traffic_recorder
+from app.core.http_pool import upstream_pool
+from app.core.load_shedding import LoadSheddingMiddleware, load_monitor
+from app.core.tracing import tracer
+
+# Logging handlers are configured at startup (see lifespan) so importing the app has no side effects
+logger = logging.getLogger(__name__)
 
 # Try to import rate limiting (optional)
 try:
@@ -32,14 +41,28 @@ except ImportError:
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown events"""
     # Startup
+    setup_logging()
     logger.info("=" * 60)
     logger.info("🚀 Customer Service Chatbot API Starting...")
     logger.info("=" * 60)
     logger.info(f"Version: {settings.API_VERSION}")
     logger.info(f"OpenAI Model: {settings.OPENAI_MODEL}")
     logger.info(f"API Documentation: http://{settings.HOST}:{settings.PORT}/docs")
+    logger.info(f"Rate limiting: {'enabled' if RATE_LIMITING_AVAILABLE and limiter else 'disabled'}")
     logger.info("=" * 60)
     
+    # Open upstream connections before traffic arrives
+    await openai_service.prewarm()
+    
+    # Start event-loop lag monitoring for load shedding
+    load_monitor.start()
+    
+    # Start background chat job workers
+    await chat_job_queue.start()
+    
+    # Start the background span exporter
+    await tracer.start()
+    
     yield
     
     # Shutdown
@@ -47,6 +70,20 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 Customer Service Chatbot API Shutting Down...")
     logger.info("=" * 60)
     
+    # Stop background monitors and pending summaries
+    await load_monitor.stop()
+    await chat_job_queue.stop()
+    await conversation_summarizer.shutdown()
+    await quota_guard.stop()
+    await llm_router.close()
+    
+    # Flush spans and traffic records still waiting to be written
+    await tracer.stop()
+    traffic_recorder.close()
+    
+    # Close pooled upstream connections
+    await upstream_pool.close()
+    
     # Cleanup old conversations
     removed = conversation_manager.cleanup_old_conversations()
     if removed > 0:
@@ -63,6 +100,10 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Shed low-priority requests when the event loop is lagging or overloaded
+# (added before CORS so that shed responses still carry CORS headers)
+app.add_middleware(LoadSheddingMiddleware)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -76,9 +117,6 @@ app.add_middleware(
 if RATE_LIMITING_AVAILABLE and limiter:
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
-    logger.info("Rate limiting enabled")
-else:
-    logger.warning("Rate limiting disabled (slowapi not installed)")
 
 # Include API routes
 app.include_router(router)
@@ -106,6 +144,7 @@ async def root():
         "endpoints": {
             "health": "GET /api/v1/health - Health check",
             "chat": "POST /api/v1/chat - Send a message to the chatbot",
+            "chat_jobs": "POST /api/v1/chat/jobs - Queue a message and get a job ID",
             "conversation": "GET /api/v1/conversation/{id} - Get conversation history",
             "documentation": "GET /docs - Interactive API documentation (Swagger UI)",
             "redoc": "GET /redoc - Alternative API documentation",
@@ -48,6 +48,14 @@ class ChatResponse(BaseModel):
     conversation_id: str = Field(..., description="Conversation ID for context tracking")
     timestamp: str = Field(..., description="Response timestamp in ISO format")
     message_count: int = Field(..., description="Number of messages in this conversation")
+    degraded: bool = Field(
+        False,
+        description="True if the answer is a local fallback because the AI service is unavailable"
+    )
+    merged_messages: int = Field(
+        1,
+        description="Number of queued customer messages answered together in this turn"
+    )
     
     class Config:
         json_schema_extra = {
@@ -55,15 +63,27 @@ class ChatResponse(BaseModel):
                 "answer": "I'd be happy to help you with your order. Could you please provide your order number?",
                 "conversation_id": "conv_123",
                 "timestamp": "2025-01-15T14:30:00.000Z",
-                "message_count": 2
+                "message_count": 2,
+                "degraded": False,
+                "merged_messages": 1
             }
         }
 
 
+class TokenUsage(BaseModel):
+    """Token usage reported by the upstream API for one call"""
+    model: str = Field(..., description="Model that served the call")
+    prompt_tokens: int = Field(0, description="Prompt tokens billed")
+    completion_tokens: int = Field(0, description="Completion tokens billed")
+    cached_tokens: int = Field(0, description="Prompt tokens served from the provider's prompt cache")
+
+
 class ConversationHistory(BaseModel):
     """Conversation history response"""
     conversation_id: str
     messages: List[Message]
+    summary: Optional[str] = Field(None, description="Running summary of older, compressed turns")
+    usage: Optional[Dict[str, int]] = Field(None, description="Token totals for this conversation")
     created_at: str
     last_updated: str
     message_count: int
@@ -82,3 +102,33 @@ class ErrorResponse(BaseModel):
     message: str = Field(..., description="Error message")
     timestamp: str = Field(..., description="Error timestamp")
 
+
+class ChatJobRequest(ChatRequest):
+    """Request model for asynchronous chat jobs"""
+    webhook_url: Optional[str] = Field(
+        None,
+        max_length=2000,
+        pattern=r"^https?://",
+        description="Optional URL that receives the finished job as a JSON POST"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "message": "I need help with my order",
+                "conversation_id": "conv_123",
+                "customer_name": "John Doe",
+                "webhook_url": "https://example.com/hooks/chat"
+            }
+        }
+
+
+class ChatJob(BaseModel):
+    """Asynchronous chat job status and result"""
+    job_id: str = Field(..., description="Job ID for polling")
+    status: str = Field(..., description="Job status: 'queued', 'running', 'completed' or 'failed'")
+    created_at: str = Field(..., description="Job creation timestamp")
+    completed_at: Optional[str] = Field(None, description="Job completion timestamp")
+    result: Optional[ChatResponse] = Field(None, description="Chat response once the job completed")
+    error: Optional[Dict[str, str]] = Field(None, description="Error details if the job failed")
+    webhook_delivered: Optional[bool] = Field(None, description="Whether the webhook callback succeeded")
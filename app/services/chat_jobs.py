@@ -0,0 +1,378 @@
+"""
+Asynchronous chat jobs: bounded persistent queue, worker pool and webhook delivery
+"""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from app.core.config import settings
+from app.models.schemas import ChatJob, ChatJobRequest
+from app.services.turn_pipeline import turn_pipeline
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue has reached its configured size"""
+
+
+class WebhookNotAllowed(Exception):
+    """Raised when a webhook URL points to a host outside JOB_WEBHOOK_ALLOWED_HOSTS or to an internal address"""
+
+
+def _is_internal_address(address: str) -> bool:
+    """Check whether an IP address is private, loopback, link-local or otherwise not publicly routable"""
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return not ip.is_global or ip.is_multicast
+
+
+class ChatJobQueue:
+    """Queues chat jobs, processes them with a fixed pool of workers and delivers results"""
+    
+    def __init__(self):
+        self.max_size = settings.JOB_QUEUE_MAX_SIZE
+        self.worker_count = settings.JOB_WORKERS
+        self.store_file = settings.JOB_STORE_FILE
+        self.result_ttl = timedelta(minutes=settings.JOB_RESULT_TTL_MINUTES)
+        self.webhook_allowed_hosts = set(settings.JOB_WEBHOOK_ALLOWED_HOSTS)
+        
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._finished: Deque[Tuple[datetime, str]] = deque()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._webhook_tasks: Set[asyncio.Task] = set()
+        self._webhook_client = None
+        self._store_lock = asyncio.Lock()
+        
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.webhooks_delivered = 0
+        self.webhooks_failed = 0
+    
+    async def start(self) -> None:
+        """Restore unfinished jobs from the job store and start the worker pool"""
+        self._queue = asyncio.Queue()
+        restored = self._load()
+        for job in self.jobs.values():
+            if job["status"] not in FINISHED_STATUSES:
+                job["status"] = "queued"
+                self._queue.put_nowait(job["job_id"])
+        
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.worker_count)
+        ]
+        logger.info(
+            f"Chat job workers started: {self.worker_count} "
+            f"(restored {restored} unfinished jobs)"
+        )
+    
+    async def stop(self) -> None:
+        """Stop the worker pool; unfinished jobs are picked up again on the next start"""
+        tasks = self._workers + list(self._webhook_tasks)
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        
+        if self._webhook_client is not None:
+            await self._webhook_client.aclose()
+            self._webhook_client = None
+    
+    async def submit(self, request: ChatJobRequest) -> ChatJob:
+        """
+        Queue a chat message for background processing
+        
+        Args:
+            request: ChatJobRequest with the message and optional webhook URL
+        
+        Returns:
+            The queued ChatJob
+        
+        Raises:
+            WebhookNotAllowed: If webhook_url is given but not allowed
+            JobQueueFull: If the queue already holds the maximum number of jobs
+        """
+        if request.webhook_url:
+            self._check_webhook_host(request.webhook_url)
+        
+        if self._purge_expired():
+            await self._compact_store()
+        
+        if self._queue is None or self._queue.qsize() >= self.max_size:
+            self.rejected += 1
+            raise JobQueueFull()
+        
+        job = {
+            "job_id": f"job_{uuid.uuid4().hex[:12]}",
+            "status": "queued",
+            "message": request.message,
+            "conversation_id": request.conversation_id,
+            "customer_name": request.customer_name,
+            "webhook_url": request.webhook_url,
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "completed_at": None,
+            "result": None,
+            "error": None,
+            "webhook_delivered": None
+        }
+        self.jobs[job["job_id"]] = job
+        await self._persist(job)
+        self._queue.put_nowait(job["job_id"])
+        
+        return self._to_model(job)
+    
+    def get_job(self, job_id: str) -> Optional[ChatJob]:
+        """Get a job's status and result, or None if unknown or expired"""
+        job = self.jobs.get(job_id)
+        return self._to_model(job) if job else None
+    
+    async def _worker(self) -> None:
+        """Process queued jobs one at a time"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if job is not None:
+                    await self._run_job(job)
+            except Exception as e:
+                logger.error(f"Unexpected error in chat job worker: {str(e)}", exc_info=True)
+            finally:
+                self._queue.task_done()
+    
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        """Run one job through the chat service and deliver its result"""
+        job["status"] = "running"
+        await self._persist(job)
+        
+        try:
+            response = await turn_pipeline.submit(
+                message=job["message"],
+                conversation_id=job["conversation_id"],
+                customer_name=job["customer_name"]
+            )
+            job["status"] = "completed"
+            job["result"] = response.model_dump()
+            self.completed += 1
+        except Exception as e:
+            logger.error(f"Chat job {job['job_id']} failed: {str(e)}")
+            job["status"] = "failed"
+            job["error"] = {"error": "Failed to process your request", "message": str(e)}
+            self.failed += 1
+        
+        job["completed_at"] = datetime.utcnow().isoformat() + "Z"
+        # The message is only needed to run the job; don't keep it in memory or on disk afterwards
+        job["message"] = None
+        job["customer_name"] = None
+        self._finished.append((datetime.utcnow(), job["job_id"]))
+        await self._persist(job)
+        
+        # Deliver in the background so slow webhooks don't hold up the workers
+        if job["webhook_url"]:
+            task = asyncio.create_task(self._deliver_webhook(job))
+            self._webhook_tasks.add(task)
+            task.add_done_callback(self._webhook_tasks.discard)
+    
+    async def _deliver_webhook(self, job: Dict[str, Any]) -> None:
+        """
+        POST a finished job to its webhook URL, retrying with backoff
+        
+        Args:
+            job: Finished job record
+        """
+        job["webhook_delivered"] = await self._post_webhook(job)
+        await self._persist(job)
+    
+    def _check_webhook_host(self, url: str) -> str:
+        """
+        Check a webhook URL against the host allowlist
+        
+        Args:
+            url: Webhook URL
+        
+        Returns:
+            The URL's host name
+        
+        Raises:
+            WebhookNotAllowed: If webhooks are disabled, or the host is not allowed or is an internal IP address
+        """
+        if not self.webhook_allowed_hosts:
+            raise WebhookNotAllowed("Webhooks are not enabled on this server")
+        
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if parts.scheme not in ("http", "https") or host not in self.webhook_allowed_hosts:
+            raise WebhookNotAllowed(f"Webhook host is not allowed: {host or url}")
+        
+        try:
+            internal = _is_internal_address(host)
+        except ValueError:
+            internal = False  # A host name; its addresses are checked before delivery
+        if internal:
+            raise WebhookNotAllowed(f"Webhook host is an internal address: {host}")
+        return host
+    
+    async def _check_webhook_target(self, url: str) -> None:
+        """
+        Check a webhook URL right before delivery, including the addresses its host resolves to
+        
+        Raises:
+            WebhookNotAllowed: If the URL is not allowed or its host resolves to an internal address
+        """
+        host = self._check_webhook_host(url)
+        try:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+        except OSError as e:
+            raise WebhookNotAllowed(f"Could not resolve webhook host {host}: {str(e)}")
+        if any(_is_internal_address(info[4][0]) for info in infos):
+            raise WebhookNotAllowed(f"Webhook host resolves to an internal address: {host}")
+    
+    async def _post_webhook(self, job: Dict[str, Any]) -> bool:
+        """Send the webhook request; returns True if the callback was accepted"""
+        # Checked again here: the allowlist may have changed since a restored job was queued
+        try:
+            await self._check_webhook_target(job["webhook_url"])
+        except WebhookNotAllowed as e:
+            logger.warning(f"Webhook for job {job['job_id']} not sent: {str(e)}")
+            self.webhooks_failed += 1
+            return False
+        
+        if self._webhook_client is None:
+            import httpx
+            self._webhook_client = httpx.AsyncClient(timeout=settings.JOB_WEBHOOK_TIMEOUT_SECONDS)
+        
+        payload = self._to_model(job).model_dump()
+        for attempt in range(settings.JOB_WEBHOOK_MAX_ATTEMPTS):
+            try:
+                response = await self._webhook_client.post(job["webhook_url"], json=payload)
+                if response.status_code < 400:
+                    self.webhooks_delivered += 1
+                    return True
+                logger.warning(
+                    f"Webhook for job {job['job_id']} returned {response.status_code} "
+                    f"(attempt {attempt + 1})"
+                )
+            except Exception as e:
+                logger.warning(f"Webhook for job {job['job_id']} failed (attempt {attempt + 1}): {str(e)}")
+            if attempt + 1 < settings.JOB_WEBHOOK_MAX_ATTEMPTS:
+                await asyncio.sleep(2 ** attempt)
+        
+        self.webhooks_failed += 1
+        return False
+    
+    def _purge_expired(self) -> int:
+        """
+        Forget finished jobs whose results are older than the retention window
+        
+        Returns:
+            Number of jobs removed
+        """
+        cutoff = datetime.utcnow() - self.result_ttl
+        removed = 0
+        while self._finished and self._finished[0][0] < cutoff:
+            _, job_id = self._finished.popleft()
+            if self.jobs.pop(job_id, None) is not None:
+                removed += 1
+        return removed
+    
+    async def _persist(self, job: Dict[str, Any]) -> None:
+        """Append the current state of a job to the job store (written off the event loop)"""
+        if not self.store_file:
+            return
+        line = json.dumps(job) + "\n"
+        async with self._store_lock:
+            await asyncio.to_thread(self._append_store, line)
+    
+    async def _compact_store(self) -> None:
+        """Rewrite the job store with one line per remaining job, dropping purged ones"""
+        if not self.store_file:
+            return
+        content = "".join(json.dumps(job) + "\n" for job in self.jobs.values())
+        async with self._store_lock:
+            await asyncio.to_thread(self._write_store, content)
+    
+    def _append_store(self, line: str) -> None:
+        """Append a line to the job store"""
+        with open(self.store_file, "a", encoding="utf-8") as f:
+            f.write(line)
+    
+    def _write_store(self, content: str) -> None:
+        """Replace the job store contents"""
+        temp_file = self.store_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_file, self.store_file)
+    
+    def _load(self) -> int:
+        """
+        Rebuild jobs from the job store and compact it
+        
+        Returns:
+            Number of unfinished jobs restored
+        """
+        if not self.store_file or not os.path.exists(self.store_file):
+            return 0
+        
+        with open(self.store_file, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    job = json.loads(line)
+                except ValueError:
+                    continue
+                self.jobs[job["job_id"]] = job
+        
+        # Drop expired results and rewrite the store with one line per job
+        cutoff = datetime.utcnow() - self.result_ttl
+        for job_id, job in list(self.jobs.items()):
+            if job["status"] in FINISHED_STATUSES:
+                completed_at = datetime.fromisoformat(job["completed_at"].rstrip("Z"))
+                if completed_at < cutoff:
+                    del self.jobs[job_id]
+                else:
+                    self._finished.append((completed_at, job_id))
+        self._finished = deque(sorted(self._finished))
+        
+        self._write_store("".join(json.dumps(job) + "\n" for job in self.jobs.values()))
+        
+        return sum(1 for job in self.jobs.values() if job["status"] not in FINISHED_STATUSES)
+    
+    def _to_model(self, job: Dict[str, Any]) -> ChatJob:
+        """Convert a job record to its API model"""
+        return ChatJob(
+            job_id=job["job_id"],
+            status=job["status"],
+            created_at=job["created_at"],
+            completed_at=job["completed_at"],
+            result=job["result"],
+            error=job["error"],
+            webhook_delivered=job["webhook_delivered"]
+        )
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job queue statistics"""
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_size,
+            "workers": len(self._workers),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "webhooks_delivered": self.webhooks_delivered,
+            "webhooks_failed": self.webhooks_failed
+        }
+
+
+# Global chat job queue instance
+chat_job_queue = ChatJobQueue()
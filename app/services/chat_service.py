@@ -0,0 +1,112 @@
+"""
+Chat service that runs a single conversation turn end to end
+"""
+
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.models.schemas import ChatResponse
+from app.services.conversation_manager import conversation_manager
+from app.services.openai_service import openai_service
+from app.services.summarizer import conversation_summarizer
+from app.services.disconnect_monitor import disconnect_monitor
+from app.services.quota_guard import QuotaExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class ChatService:
+    """Processes customer messages through the conversation store and OpenAI service"""
+    
+    async def process_message(
+        self,
+        message: str,
+        conversation_id: Optional[str] = None,
+        customer_name: Optional[str] = None,
+        deadline: Optional[float] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> ChatResponse:
+        """
+        Run one conversation turn: load history, get the AI response and store both messages
+        
+        Args:
+            message: The customer's message
+            conversation_id: Optional existing conversation ID
+            customer_name: Optional customer name for personalization
+            deadline: Seconds the caller is willing to wait for the upstream call
+            is_disconnected: Optional callback; the upstream call is cancelled once it returns True
+        
+        Returns:
+            ChatResponse with AI-generated answer, conversation_id, and metadata
+        
+        Raises:
+            ClientDisconnected: If the client disconnected before the response was ready
+            QuotaExceeded: If the OpenAI quota is exhausted and degraded answers are disabled
+            Exception: If the OpenAI API call fails
+        """
+        with tracer.span("chat.turn", **{"conversation.new": conversation_id is None}) as span:
+            # Get or create conversation
+            with tracer.span("conversation.get_or_create"):
+                conversation_id = conversation_manager.get_or_create_conversation(conversation_id)
+            span.set_attribute("conversation.id", conversation_id)
+            
+            # Get conversation history
+            with tracer.span("conversation.build_history") as history_span:
+                conversation_history = conversation_manager.get_conversation_history_for_openai(
+                    conversation_id
+                )
+                history_span.set_attribute("history.messages", len(conversation_history))
+            
+            # Get AI response (cancelled if the client disconnects while waiting)
+            response_call = openai_service.get_chat_response(
+                user_message=message,
+                conversation_history=conversation_history,
+                customer_name=customer_name,
+                deadline=deadline,
+                on_usage=lambda usage: conversation_manager.record_usage(conversation_id, usage)
+            )
+            degraded = False
+            try:
+                if is_disconnected is not None:
+                    ai_response = await disconnect_monitor.run(response_call, is_disconnected)
+                else:
+                    ai_response = await response_call
+            except QuotaExceeded:
+                if not settings.QUOTA_DEGRADED_FALLBACK:
+                    raise
+                # Answer locally until the quota is back instead of failing the turn
+                ai_response = openai_service.get_degraded_response(message, customer_name)
+                degraded = True
+            span.set_attribute("chat.degraded", degraded)
+            
+            # Add messages to conversation history
+            with tracer.span("conversation.store_messages"):
+                conversation_manager.add_message(conversation_id, "user", message)
+                conversation_manager.add_message(conversation_id, "assistant", ai_response)
+            
+            # Fold older turns into the running summary in the background
+            conversation_summarizer.maybe_schedule(conversation_id)
+            
+            # Get message count
+            message_count = conversation_manager.get_message_count(conversation_id)
+            
+            # Log successful response
+            logger.info(
+                f"Response generated for conversation {conversation_id} - "
+                f"Message count: {message_count}"
+                + (" (degraded)" if degraded else "")
+            )
+            
+            return ChatResponse(
+                answer=ai_response,
+                conversation_id=conversation_id,
+                timestamp=datetime.utcnow().isoformat() + "Z",
+                message_count=message_count,
+                degraded=degraded
+            )
+
+
+# Global chat service instance
+chat_service = ChatService()
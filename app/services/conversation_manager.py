@@ -2,25 +2,44 @@
 Conversation management service for maintaining chat history and context
 """
 
+import heapq
+import logging
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from app.models.schemas import Message
+from typing import Any, Dict, Iterator, List, Optional
+from app.models.schemas import Message, TokenUsage
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Approximate fixed memory cost of a stored message / conversation, on top of its text
+MESSAGE_OVERHEAD_BYTES = 250
+CONVERSATION_OVERHEAD_BYTES = 500
+
 
 class ConversationManager:
     """Manages conversation history and context"""
     
     def __init__(self):
-        self.conversations: Dict[str, Dict] = {}
+        # Ordered from least to most recently updated, for LRU eviction
+        self.conversations: "OrderedDict[str, Dict]" = OrderedDict()
         self.timeout_minutes = settings.CONVERSATION_TIMEOUT_MINUTES
         self.max_history = settings.MAX_CONVERSATION_HISTORY
+        self.trim_block = max(settings.HISTORY_TRIM_BLOCK_MESSAGES, 1)
+        self.memory_budget_bytes = settings.CONVERSATION_MEMORY_BUDGET_MB * 1024 * 1024
+        self.total_bytes = 0
+        self.evictions = 0
+        self.model_usage: Dict[str, Dict[str, int]] = {}
+        self.token_prices = settings.TOKEN_PRICES
     
     def get_or_create_conversation(self, conversation_id: Optional[str] = None) -> str:
         """
         Get existing conversation ID or create a new one
         
+        Unknown, expired or evicted conversation IDs get a new server-generated ID,
+        so clients cannot create conversations under IDs of their choosing.
+        
         Args:
             conversation_id: Optional existing conversation ID
             
@@ -32,19 +51,63 @@ class ConversationManager:
             last_updated = self.conversations[conversation_id]["last_updated"]
             if datetime.now() - last_updated > timedelta(minutes=self.timeout_minutes):
                 # Conversation timed out, create new one
-                del self.conversations[conversation_id]
+                self._remove_conversation(conversation_id)
                 conversation_id = None
+        elif conversation_id:
+            conversation_id = None
         
         if not conversation_id:
             conversation_id = f"conv_{uuid.uuid4().hex[:12]}"
-            self.conversations[conversation_id] = {
-                "messages": [],
-                "created_at": datetime.now(),
-                "last_updated": datetime.now()
-            }
+            self._create_conversation(conversation_id)
         
         return conversation_id
     
+    def _create_conversation(self, conversation_id: str) -> None:
+        """Store a new, empty conversation under the given ID"""
+        self.conversations[conversation_id] = {
+            "messages": [],
+            "summary": None,
+            "created_at": datetime.now(),
+            "last_updated": datetime.now(),
+            "size_bytes": CONVERSATION_OVERHEAD_BYTES,
+            "usage": self._empty_usage()
+        }
+        self.total_bytes += CONVERSATION_OVERHEAD_BYTES
+    
+    def _remove_conversation(self, conversation_id: str) -> None:
+        """Remove a conversation and release its accounted memory"""
+        conv_data = self.conversations.pop(conversation_id)
+        self.total_bytes -= conv_data["size_bytes"]
+    
+    def _message_size(self, message: Message) -> int:
+        """Approximate memory used by a stored message, in bytes"""
+        return (
+            MESSAGE_OVERHEAD_BYTES
+            + len(message.role)
+            + len(message.content.encode("utf-8"))
+            + len(message.timestamp or "")
+        )
+    
+    def _resize(self, conversation_id: str, delta: int) -> None:
+        """Adjust the accounted size of a conversation and the global total"""
+        self.conversations[conversation_id]["size_bytes"] += delta
+        self.total_bytes += delta
+    
+    def _enforce_memory_budget(self, keep_conversation_id: str) -> None:
+        """
+        Evict least-recently-updated conversations until the store fits its budget
+        
+        Args:
+            keep_conversation_id: Conversation that is never evicted (the one just updated)
+        """
+        while self.total_bytes > self.memory_budget_bytes and len(self.conversations) > 1:
+            oldest_id = next(iter(self.conversations))
+            if oldest_id == keep_conversation_id:
+                break
+            self._remove_conversation(oldest_id)
+            self.evictions += 1
+            logger.debug(f"Evicted conversation {oldest_id} (memory budget exceeded)")
+    
     def add_message(self, conversation_id: str, role: str, content: str) -> None:
         """
         Add a message to conversation history
@@ -55,7 +118,8 @@ class ConversationManager:
             content: Message content
         """
         if conversation_id not in self.conversations:
-            self.get_or_create_conversation(conversation_id)
+            # Removed while the response was being generated (cleared, expired or evicted)
+            self._create_conversation(conversation_id)
         
         message = Message(
             role=role,
@@ -65,12 +129,23 @@ class ConversationManager:
         
         self.conversations[conversation_id]["messages"].append(message)
         self.conversations[conversation_id]["last_updated"] = datetime.now()
+        self.conversations.move_to_end(conversation_id)
+        self._resize(conversation_id, self._message_size(message))
         
         # Limit conversation history
         messages = self.conversations[conversation_id]["messages"]
-        if len(messages) > self.max_history * 2:  # *2 because we have user + assistant pairs
-            # Keep only the most recent messages
-            self.conversations[conversation_id]["messages"] = messages[-self.max_history * 2:]
+        limit = self.max_history * 2  # *2 because we have user + assistant pairs
+        if len(messages) > limit:
+            # Drop a whole block of the oldest messages at once, so the history prefix (and the
+            # provider's prompt cache) stays the same for the next few turns instead of shifting
+            # on every one; an even count keeps the history starting with a user message
+            drop = len(messages) - max(limit - self.trim_block, 0)
+            drop += drop % 2
+            dropped = messages[:drop]
+            self.conversations[conversation_id]["messages"] = messages[drop:]
+            self._resize(conversation_id, -sum(self._message_size(msg) for msg in dropped))
+        
+        self._enforce_memory_budget(conversation_id)
     
     def get_messages(self, conversation_id: str) -> List[Message]:
         """
@@ -98,7 +173,66 @@ class ConversationManager:
             List of message dictionaries for OpenAI API
         """
         messages = self.get_messages(conversation_id)
-        return [{"role": msg.role, "content": msg.content} for msg in messages]
+        history = [{"role": msg.role, "content": msg.content} for msg in messages]
+        
+        # Each new summary changes this first message and so starts a fresh prompt cache prefix
+        summary = self.get_summary(conversation_id)
+        if summary:
+            history.insert(0, {
+                "role": "system",
+                "content": f"Summary of the earlier conversation: {summary}"
+            })
+        
+        return history
+    
+    def get_summary(self, conversation_id: str) -> Optional[str]:
+        """Get the running summary of older turns, if one exists"""
+        if conversation_id not in self.conversations:
+            return None
+        return self.conversations[conversation_id].get("summary")
+    
+    def get_messages_to_summarize(self, conversation_id: str, keep_recent: int) -> List[Message]:
+        """
+        Get the older messages that should be folded into the running summary
+        
+        Args:
+            conversation_id: Conversation ID
+            keep_recent: Number of most recent messages to keep verbatim
+        
+        Returns:
+            List of messages older than the most recent `keep_recent` ones
+        """
+        messages = self.get_messages(conversation_id)
+        if len(messages) <= keep_recent:
+            return []
+        return messages[:len(messages) - keep_recent]
+    
+    def apply_summary(self, conversation_id: str, summary: str, summarized: List[Message]) -> None:
+        """
+        Replace summarized messages with the new running summary
+        
+        Messages added while the summary was being generated are kept, since
+        only the exact message objects that were summarized get removed.
+        
+        Args:
+            conversation_id: Conversation ID
+            summary: New running summary (already includes any previous summary)
+            summarized: Messages that the summary covers
+        """
+        if conversation_id not in self.conversations:
+            return
+        
+        summarized_ids = {id(msg) for msg in summarized}
+        conv_data = self.conversations[conversation_id]
+        removed = [msg for msg in conv_data["messages"] if id(msg) in summarized_ids]
+        conv_data["messages"] = [
+            msg for msg in conv_data["messages"] if id(msg) not in summarized_ids
+        ]
+        
+        delta = len(summary.encode("utf-8")) - len((conv_data["summary"] or "").encode("utf-8"))
+        delta -= sum(self._message_size(msg) for msg in removed)
+        conv_data["summary"] = summary
+        self._resize(conversation_id, delta)
     
     def get_message_count(self, conversation_id: str) -> int:
         """Get the number of messages in a conversation"""
@@ -117,10 +251,45 @@ class ConversationManager:
             True if conversation was cleared, False if not found
         """
         if conversation_id in self.conversations:
-            del self.conversations[conversation_id]
+            self._remove_conversation(conversation_id)
             return True
         return False
     
+    def iter_conversations(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily iterate over stored conversations for export
+        
+        Only the conversation IDs are snapshotted up front; each conversation is
+        serialized when it is reached, and ones removed in the meantime are skipped.
+        
+        Args:
+            since: Only include conversations updated at or after this time
+            until: Only include conversations created at or before this time
+        
+        Yields:
+            Export records with conversation metadata and messages
+        """
+        for conv_id in list(self.conversations.keys()):
+            conv_data = self.conversations.get(conv_id)
+            if conv_data is None:
+                continue
+            if since and conv_data["last_updated"] < since:
+                continue
+            if until and conv_data["created_at"] > until:
+                continue
+            
+            yield {
+                "conversation_id": conv_id,
+                "created_at": conv_data["created_at"].isoformat() + "Z",
+                "last_updated": conv_data["last_updated"].isoformat() + "Z",
+                "summary": conv_data.get("summary"),
+                "messages": [msg.model_dump() for msg in conv_data["messages"]]
+            }
+    
     def cleanup_old_conversations(self) -> int:
         """
         Remove conversations that have timed out
@@ -135,11 +304,111 @@ class ConversationManager:
         conversation_ids = list(self.conversations.keys())
         for conv_id in conversation_ids:
             last_updated = self.conversations[conv_id]["last_updated"]
-            if now - last_updated > timeout:
-                del self.conversations[conv_id]
-                removed += 1
+            if now - last_updated <= timeout:
+                # Conversations are ordered by last update, so the rest are newer
+                break
+            self._remove_conversation(conv_id)
+            removed += 1
         
         return removed
+    
+    def _empty_usage(self) -> Dict[str, int]:
+        """Zeroed token counters"""
+        return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+    
+    def record_usage(self, conversation_id: str, usage: TokenUsage) -> None:
+        """
+        Add the token usage of one upstream call to the conversation and model totals
+        
+        Args:
+            conversation_id: Conversation the call was made for
+            usage: Token usage reported by the upstream API
+        """
+        totals = [self.model_usage.setdefault(usage.model, self._empty_usage())]
+        if conversation_id in self.conversations:
+            totals.append(self.conversations[conversation_id]["usage"])
+        
+        for total in totals:
+            total["calls"] += 1
+            total["prompt_tokens"] += usage.prompt_tokens
+            total["completion_tokens"] += usage.completion_tokens
+            total["cached_tokens"] += usage.cached_tokens
+    
+    def _get_price(self, model: str) -> Optional[Dict[str, float]]:
+        """Find the price entry for a model (exact match, else longest matching prefix)"""
+        if model in self.token_prices:
+            return self.token_prices[model]
+        matches = [name for name in self.token_prices if model.startswith(name)]
+        return self.token_prices[max(matches, key=len)] if matches else None
+    
+    def estimate_cost(self, model: str, usage: Dict[str, int]) -> Optional[float]:
+        """
+        Estimate the cost of token usage in USD from the configured price table
+        
+        Args:
+            model: Model name
+            usage: Token counters (prompt, completion and cached tokens)
+        
+        Returns:
+            Estimated cost in USD, or None if the model has no price entry
+        """
+        price = self._get_price(model)
+        if price is None:
+            return None
+        
+        uncached_prompt = usage["prompt_tokens"] - usage["cached_tokens"]
+        cost = (
+            uncached_prompt * price["prompt"]
+            + usage["cached_tokens"] * price.get("cached", price["prompt"])
+            + usage["completion_tokens"] * price["completion"]
+        )
+        return round(cost / 1_000_000, 6)  # Prices are per million tokens
+    
+    def get_usage_report(self, top_n: int = 10) -> Dict[str, Any]:
+        """
+        Get aggregate token usage with cost estimates
+        
+        Args:
+            top_n: Number of highest-usage conversations to include
+        
+        Returns:
+            Totals, per-model usage and the conversations using the most tokens
+        """
+        totals = self._empty_usage()
+        total_cost = 0.0
+        models = {}
+        for model, usage in self.model_usage.items():
+            cost = self.estimate_cost(model, usage)
+            models[model] = {**usage, "estimated_cost_usd": cost}
+            total_cost += cost or 0.0
+            for key in totals:
+                totals[key] += usage[key]
+        
+        top_conversations = heapq.nlargest(
+            top_n,
+            self.conversations.items(),
+            key=lambda item: item[1]["usage"]["prompt_tokens"] + item[1]["usage"]["completion_tokens"]
+        )
+        
+        return {
+            "totals": {**totals, "estimated_cost_usd": round(total_cost, 6)},
+            "models": models,
+            "top_conversations": [
+                {"conversation_id": conv_id, **conv_data["usage"]}
+                for conv_id, conv_data in top_conversations
+                if conv_data["usage"]["calls"]
+            ]
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get conversation store size and eviction statistics"""
+        return {
+            "conversations": len(self.conversations),
+            "total_bytes": self.total_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "memory_utilization": self.total_bytes / self.memory_budget_bytes if self.memory_budget_bytes else 0.0,
+            "evictions": self.evictions
+        }
 
 
 # Global conversation manager instance
@@ -0,0 +1,96 @@
+"""
+Client disconnect detection and cancellation of abandoned upstream work
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client went away before its response was ready"""
+
+
+class DisconnectMonitor:
+    """Cancels upstream calls for clients that disconnected and tracks the savings"""
+    
+    def __init__(self):
+        self.poll_interval = settings.DISCONNECT_POLL_INTERVAL_SECONDS
+        self.abandoned_requests = 0
+        self.estimated_tokens_saved = 0
+        self.completions = 0
+        self.completion_tokens = 0
+    
+    def record_completion(self, usage: Any) -> None:
+        """
+        Record completion tokens from an upstream usage object
+        
+        Used to estimate how many tokens an abandoned request would have cost.
+        
+        Args:
+            usage: The `usage` field of a chat completion response (may be None)
+        """
+        if usage is None:
+            return
+        self.completions += 1
+        self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+    
+    def record_abandoned(self, tokens_already_generated: int = 0) -> None:
+        """
+        Record a request abandoned by its client
+        
+        Args:
+            tokens_already_generated: Completion tokens produced before cancellation
+        """
+        self.abandoned_requests += 1
+        if self.completions:
+            average = self.completion_tokens // self.completions
+            self.estimated_tokens_saved += max(average - tokens_already_generated, 0)
+    
+    async def run(self, coro: Awaitable[T], is_disconnected: Callable[[], Awaitable[bool]]) -> T:
+        """
+        Await an upstream call, cancelling it if the client disconnects first
+        
+        Args:
+            coro: Awaitable producing the upstream result
+            is_disconnected: Callback that reports whether the client has gone away
+        
+        Returns:
+            Result of the awaitable
+        
+        Raises:
+            ClientDisconnected: If the client disconnected before the result was ready
+        """
+        task = asyncio.ensure_future(coro)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=self.poll_interval)
+                if done:
+                    return task.result()
+                if await is_disconnected():
+                    task.cancel()
+                    self.record_abandoned()
+                    logger.info("Client disconnected, cancelled upstream request")
+                    raise ClientDisconnected()
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get abandoned request statistics"""
+        return {
+            "abandoned_requests": self.abandoned_requests,
+            "estimated_tokens_saved": self.estimated_tokens_saved,
+            "average_completion_tokens": (
+                self.completion_tokens / self.completions if self.completions else 0.0
+            )
+        }
+
+
+# Global disconnect monitor instance
+disconnect_monitor = DisconnectMonitor()
@@ -0,0 +1,186 @@
+"""
+Intent-aware generation profiles: per-intent output limits and output-length tracking
+"""
+
+import logging
+import math
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Stop sequences that end a reply before the model starts writing the customer's next turn
+TURN_STOP_SEQUENCES = ["\nCustomer:", "\nUser:"]
+
+# Default profiles; entries in the GENERATION_PROFILES setting override them field by field
+DEFAULT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "smalltalk": {"max_tokens": 80, "temperature": 0.7, "stop": TURN_STOP_SEQUENCES},
+    "details": {"max_tokens": 150, "temperature": 0.3, "stop": TURN_STOP_SEQUENCES},
+    "order_status": {"max_tokens": 200, "temperature": 0.3, "stop": TURN_STOP_SEQUENCES},
+    "returns": {"max_tokens": 250, "temperature": 0.3, "stop": TURN_STOP_SEQUENCES},
+    "complaint": {"max_tokens": 350, "temperature": 0.5, "stop": TURN_STOP_SEQUENCES},
+    "general": {
+        "max_tokens": settings.OPENAI_MAX_TOKENS,
+        "temperature": settings.OPENAI_TEMPERATURE,
+        "stop": TURN_STOP_SEQUENCES
+    },
+}
+
+COMPLAINT_PATTERN = re.compile(
+    r"\b(angry|furious|terrible|awful|worst|unacceptable|ridiculous|disappointed|complain\w*|scam|lawyer)\b"
+)
+RETURNS_PATTERN = re.compile(r"\b(return\w*|refund\w*|exchange\w*|damaged|broken|wrong item)\b")
+ORDER_PATTERN = re.compile(r"\b(order\w*|purchase\w*|track\w*|shipping|shipment|deliver\w*|package|parcel)\b")
+SMALLTALK_PATTERN = re.compile(r"\b(hello|hi|hey|thanks|thank you|thx|bye|goodbye|great|ok|okay)\b")
+DETAIL_REQUEST_PATTERN = re.compile(r"\b(number|provide|share|confirm|which|what is your|could you)\b")
+
+
+class GenerationProfiles:
+    """Classifies each turn into an intent and tracks output lengths per intent"""
+    
+    def __init__(self):
+        self.enabled = settings.GENERATION_PROFILES_ENABLED
+        self.profiles = {name: dict(profile) for name, profile in DEFAULT_PROFILES.items()}
+        for name, overrides in settings.GENERATION_PROFILES.items():
+            if name not in self.profiles:
+                logger.warning(f"Ignoring unknown generation profile: {name}")
+                continue
+            self.profiles[name].update(overrides)
+        
+        self.window = settings.GENERATION_STATS_WINDOW
+        self.output_tokens: Dict[str, Deque[int]] = {}
+        self.requests: Dict[str, int] = {}
+        self.truncated: Dict[str, int] = {}
+    
+    def classify(self, user_message: str, conversation_history: List[Dict[str, str]]) -> str:
+        """
+        Pick the intent of a turn with keyword rules (no model call)
+        
+        Args:
+            user_message: The customer's message
+            conversation_history: Previous messages in the conversation
+        
+        Returns:
+            Profile name
+        """
+        message = user_message.lower()
+        
+        if COMPLAINT_PATTERN.search(message):
+            return "complaint"
+        
+        # A short answer with a number right after the assistant asked for details
+        last_reply = next(
+            (msg["content"].lower() for msg in reversed(conversation_history) if msg["role"] == "assistant"),
+            ""
+        )
+        if (
+            len(message) <= 80
+            and any(char.isdigit() for char in message)
+            and "?" in last_reply
+            and DETAIL_REQUEST_PATTERN.search(last_reply)
+        ):
+            return "details"
+        
+        if RETURNS_PATTERN.search(message):
+            return "returns"
+        if ORDER_PATTERN.search(message):
+            return "order_status"
+        if len(message) <= 40 and SMALLTALK_PATTERN.search(message):
+            return "smalltalk"
+        return "general"
+    
+    def select(self, user_message: str, conversation_history: List[Dict[str, str]]) -> str:
+        """
+        Choose the generation profile for a turn
+        
+        Args:
+            user_message: The customer's message
+            conversation_history: Previous messages in the conversation
+        
+        Returns:
+            Profile name ("general" when profiles are disabled)
+        """
+        if not self.enabled:
+            return "general"
+        profile = self.classify(user_message, conversation_history)
+        return profile if profile in self.profiles else "general"
+    
+    def get_params(self, profile: str) -> Dict[str, Any]:
+        """
+        Get the generation parameters of a profile
+        
+        Args:
+            profile: Profile name
+        
+        Returns:
+            Chat completion parameters (max_tokens, temperature and stop sequences)
+        """
+        profile_params = self.profiles[profile]
+        params = {
+            "max_tokens": profile_params["max_tokens"],
+            "temperature": profile_params["temperature"]
+        }
+        if profile_params.get("stop"):
+            params["stop"] = profile_params["stop"]
+        return params
+    
+    def record_output(self, profile: str, response: Any) -> None:
+        """
+        Record the output length of a completion for its profile
+        
+        Args:
+            profile: Profile the completion was generated with
+            response: Chat completion response
+        """
+        if response.usage is None:
+            return
+        
+        if profile not in self.output_tokens:
+            self.output_tokens[profile] = deque(maxlen=self.window)
+            self.requests[profile] = 0
+            self.truncated[profile] = 0
+        
+        self.output_tokens[profile].append(response.usage.completion_tokens or 0)
+        self.requests[profile] += 1
+        if getattr(response.choices[0], "finish_reason", None) == "length":
+            self.truncated[profile] += 1
+    
+    def _percentile(self, ordered: List[int], fraction: float) -> int:
+        """Nearest-rank percentile of a sorted list"""
+        return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+    
+    def get_profile_stats(self, profile: str) -> Dict[str, Any]:
+        """Get the limits and the recent output-length distribution of a profile"""
+        stats: Dict[str, Any] = {**self.get_params(profile), "requests": self.requests.get(profile, 0)}
+        lengths = sorted(self.output_tokens.get(profile, ()))
+        if not lengths:
+            return stats
+        
+        p99 = self._percentile(lengths, 0.99)
+        stats.update({
+            "truncated": self.truncated[profile],
+            "output_tokens": {
+                "mean": round(sum(lengths) / len(lengths), 1),
+                "p50": self._percentile(lengths, 0.5),
+                "p90": self._percentile(lengths, 0.9),
+                "p99": p99,
+                "max": lengths[-1]
+            },
+            # Headroom over the observed p99, once there is enough data to trust it
+            "suggested_max_tokens": math.ceil(p99 * 1.2) if len(lengths) >= 50 else None
+        })
+        return stats
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-profile limits and output-length distributions"""
+        return {
+            "enabled": self.enabled,
+            "window": self.window,
+            "profiles": {name: self.get_profile_stats(name) for name in self.profiles}
+        }
+
+
+# Global generation profiles instance
+generation_profiles = GenerationProfiles()
@@ -0,0 +1,100 @@
+"""
+Hedging policy for upstream completions: latency tracking, hedge delay and load cap
+"""
+
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HedgingPolicy:
+    """Decides when to fire a backup upstream request and tracks hedge statistics"""
+    
+    def __init__(self):
+        self.enabled = settings.HEDGE_ENABLED
+        self.percentile = settings.HEDGE_PERCENTILE
+        self.min_delay = settings.HEDGE_MIN_DELAY_SECONDS
+        self.min_samples = settings.HEDGE_MIN_SAMPLES
+        self.max_hedge_ratio = settings.HEDGE_MAX_RATIO
+        self.fallback_model = settings.HEDGE_FALLBACK_MODEL or None
+        
+        self.latencies: Deque[float] = deque(maxlen=settings.HEDGE_LATENCY_WINDOW)
+        self.requests = 0
+        self.hedges_fired = 0
+        self.hedges_won = 0
+        self.hedges_capped = 0
+        self.deadlines_exceeded = 0
+    
+    def get_latency_percentile(self) -> Optional[float]:
+        """Get the configured latency percentile over the recent window"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(int(len(ordered) * self.percentile), len(ordered) - 1)
+        return ordered[index]
+    
+    def get_hedge_delay(self) -> Optional[float]:
+        """
+        Start tracking a new request and get how long to wait before hedging it
+        
+        Returns:
+            Delay in seconds, or None if this request should not be hedged
+        """
+        self.requests += 1
+        if not self.enabled:
+            return None
+        
+        percentile = self.get_latency_percentile()
+        if percentile is None:
+            return None
+        return max(percentile, self.min_delay)
+    
+    def try_acquire_hedge(self) -> bool:
+        """
+        Check the extra-load cap before firing a hedged request
+        
+        Returns:
+            True if the hedge may be fired
+        """
+        if self.hedges_fired + 1 > self.max_hedge_ratio * self.requests:
+            self.hedges_capped += 1
+            return False
+        self.hedges_fired += 1
+        return True
+    
+    def record_result(self, latency: float, hedge_won: bool = False) -> None:
+        """
+        Record the latency of a completed request
+        
+        Args:
+            latency: Seconds from the primary request start to the winning response
+            hedge_won: True if the hedged backup request answered first
+        """
+        self.latencies.append(latency)
+        if hedge_won:
+            self.hedges_won += 1
+    
+    def record_deadline_exceeded(self) -> None:
+        """Record a request that ran past its deadline"""
+        self.deadlines_exceeded += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedging statistics"""
+        return {
+            "enabled": self.enabled,
+            "requests": self.requests,
+            "hedges_fired": self.hedges_fired,
+            "hedges_won": self.hedges_won,
+            "hedges_capped": self.hedges_capped,
+            "deadlines_exceeded": self.deadlines_exceeded,
+            "hedge_rate": self.hedges_fired / self.requests if self.requests else 0.0,
+            "hedge_win_rate": self.hedges_won / self.hedges_fired if self.hedges_fired else 0.0,
+            "current_hedge_delay": self.get_latency_percentile()
+        }
+
+
+# Global hedging policy instance
+hedging_policy = HedgingPolicy()
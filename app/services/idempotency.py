@@ -0,0 +1,143 @@
+"""
+Idempotency-Key support: replays completed chat responses and joins retries to in-flight calls
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.models.schemas import ChatResponse
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyKeyMismatch(Exception):
+    """Raised when an Idempotency-Key is reused with a different request body"""
+
+
+class IdempotencyCache:
+    """Remembers chat responses by Idempotency-Key so client retries don't repeat the turn"""
+    
+    def __init__(self):
+        self.ttl = settings.IDEMPOTENCY_TTL_SECONDS
+        self.max_keys = settings.IDEMPOTENCY_MAX_KEYS
+        
+        # key -> (expires_at, fingerprint, response), oldest first
+        self._completed: "OrderedDict[str, Tuple[float, str, ChatResponse]]" = OrderedDict()
+        # key -> (fingerprint, task running the original request)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+        
+        self.replayed = 0
+        self.attached = 0
+        self.executed = 0
+        self.mismatched = 0
+    
+    @staticmethod
+    def fingerprint(**request: Any) -> str:
+        """Hash the request fields that must match for a key to be reused"""
+        payload = json.dumps(request, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        process: Callable[[], Awaitable[ChatResponse]]
+    ) -> ChatResponse:
+        """
+        Run a chat turn at most once per Idempotency-Key
+        
+        The original call runs as its own task, so a client that disconnects and
+        retries attaches to it instead of cancelling it. Failed calls are not
+        cached and can be retried with the same key.
+        
+        Args:
+            key: Client-supplied Idempotency-Key
+            fingerprint: Fingerprint of the request body
+            process: Callable that starts the chat turn
+        
+        Returns:
+            ChatResponse of the original request
+        
+        Raises:
+            IdempotencyKeyMismatch: If the key was used with a different request
+            Exception: Whatever the original chat turn raised
+        """
+        with tracer.span("idempotency.lookup") as span:
+            self._purge_expired()
+            
+            if key in self._completed:
+                _, stored_fingerprint, response = self._completed[key]
+                self._check_fingerprint(key, stored_fingerprint, fingerprint)
+                span.set_attribute("cache.result", "hit")
+                self.replayed += 1
+                logger.info(f"Replaying stored response for Idempotency-Key {key}")
+                return response
+            
+            task = None
+            if key in self._in_flight:
+                stored_fingerprint, task = self._in_flight[key]
+                self._check_fingerprint(key, stored_fingerprint, fingerprint)
+                span.set_attribute("cache.result", "attached")
+                self.attached += 1
+                logger.info(f"Attaching retry to in-flight request for Idempotency-Key {key}")
+            else:
+                span.set_attribute("cache.result", "miss")
+        
+        # Started outside the lookup span so the turn's spans hang off the request span
+        if task is None:
+            task = asyncio.create_task(process())
+            self._in_flight[key] = (fingerprint, task)
+            task.add_done_callback(lambda done: self._finish(key, fingerprint, done))
+            self.executed += 1
+        
+        # Shield so one waiter going away doesn't cancel the call for the others
+        return await asyncio.shield(task)
+    
+    def _check_fingerprint(self, key: str, stored: str, received: str) -> None:
+        """Reject reuse of a key for a different request"""
+        if stored != received:
+            self.mismatched += 1
+            raise IdempotencyKeyMismatch(
+                f"Idempotency-Key {key} was already used with a different request"
+            )
+    
+    def _finish(self, key: str, fingerprint: str, task: asyncio.Task) -> None:
+        """Move a finished call from in-flight to the completed cache"""
+        self._in_flight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        
+        self._completed[key] = (time.monotonic() + self.ttl, fingerprint, task.result())
+        while len(self._completed) > self.max_keys:
+            self._completed.popitem(last=False)
+    
+    def _purge_expired(self) -> None:
+        """Drop stored responses past their TTL (entries are kept in expiry order)"""
+        now = time.monotonic()
+        while self._completed:
+            key, (expires_at, _, _) = next(iter(self._completed.items()))
+            if expires_at > now:
+                break
+            del self._completed[key]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get idempotency cache statistics"""
+        return {
+            "stored_responses": len(self._completed),
+            "in_flight": len(self._in_flight),
+            "executed": self.executed,
+            "replayed": self.replayed,
+            "attached_retries": self.attached,
+            "key_mismatches": self.mismatched,
+            "ttl_seconds": self.ttl
+        }
+
+
+# Global idempotency cache instance
+idempotency_cache = IdempotencyCache()
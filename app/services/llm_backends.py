@@ -0,0 +1,390 @@
+"""
+Pluggable LLM backends (OpenAI API, OpenAI-compatible local server, in-process CPU model) and routing
+"""
+
+import asyncio
+import importlib.util
+import logging
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.core.config import settings
+from app.core.http_pool import upstream_pool
+
+logger = logging.getLogger(__name__)
+
+
+class LLMBackend(ABC):
+    """
+    Base class for chat completion backends
+    
+    All backends share the OpenAI semantics: `complete` returns a chat completion
+    object (`choices[0].message.content`, `model`, `usage`), and `open_stream`
+    returns an async iterator of text chunks. Streams carry no usage.
+    """
+    
+    name = "backend"
+    
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+        self.failures = 0
+    
+    @property
+    def available(self) -> bool:
+        """Whether the backend is configured and can take requests"""
+        return True
+    
+    @abstractmethod
+    async def complete(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params: Any) -> Any:
+        """
+        Create a chat completion
+        
+        Args:
+            messages: Messages list in OpenAI format
+            model: Model to use (defaults to the backend's model)
+            **params: Generation parameters (temperature, max_tokens, ...)
+        
+        Returns:
+            Chat completion response
+        """
+    
+    @abstractmethod
+    async def open_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        """
+        Start a streamed chat completion
+        
+        Args:
+            messages: Messages list in OpenAI format
+            **params: Generation parameters (temperature, max_tokens, ...)
+        
+        Returns:
+            Async iterator of response text chunks; closing it stops generation
+        """
+    
+    async def prewarm(self) -> None:
+        """Prepare the backend before the first requests"""
+    
+    async def close(self) -> None:
+        """Release backend resources"""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+        return {
+            "available": self.available,
+            "model": self.model,
+            "calls": self.calls,
+            "failures": self.failures
+        }
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI API, or any server that implements the OpenAI chat completions API"""
+    
+    def __init__(self, name: str, model: str, api_key: str, base_url: Optional[str] = None):
+        super().__init__(model)
+        self.name = name
+        self.api_key = api_key
+        self.base_url = base_url
+        
+        # The OpenAI client (and the openai package itself) is created on first use
+        self._client = None
+        self._client_initialized = False
+    
+    @property
+    def client(self):
+        """OpenAI client, or None without an API key"""
+        if not self._client_initialized:
+            self._client_initialized = True
+            if self.api_key:
+                # Imported lazily: the openai package is a large part of app import time
+                from openai import AsyncOpenAI
+                self._client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    base_url=self.base_url,
+                    http_client=upstream_pool.client
+                )
+                logger.info(f"OpenAI client initialized for backend: {self.name}")
+        return self._client
+    
+    @client.setter
+    def client(self, value) -> None:
+        self._client = value
+        self._client_initialized = True
+    
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+    
+    async def complete(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params: Any) -> Any:
+        return await self.client.chat.completions.create(
+            model=model or self.model,
+            messages=messages,
+            **params
+        )
+    
+    async def open_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+        return self._iter_stream(stream)
+    
+    async def _iter_stream(self, stream: Any) -> AsyncIterator[str]:
+        """Yield text deltas from an OpenAI stream"""
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            # Close the upstream connection if the consumer stopped early
+            await stream.close()
+    
+    async def prewarm(self) -> None:
+        if self.client is not None:
+            await upstream_pool.prewarm(
+                f"{self.client.base_url}models",
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+
+
+class CPUModelBackend(LLMBackend):
+    """
+    In-process GGUF model served by llama-cpp-python on a thread pool
+    
+    llama.cpp releases the GIL while generating, so worker threads keep the
+    event loop free. Each worker thread loads its own copy of the model.
+    """
+    
+    name = "cpu"
+    
+    def __init__(self, model_path: str, workers: int, context_tokens: int, threads: int):
+        super().__init__(model_path.rsplit("/", 1)[-1])
+        self.model_path = model_path
+        self.workers = workers
+        self.context_tokens = context_tokens
+        self.threads = threads or None
+        self.installed = importlib.util.find_spec("llama_cpp") is not None
+        if model_path and not self.installed:
+            logger.warning("llama-cpp-python not installed, CPU model backend disabled (pip install llama-cpp-python)")
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+    
+    @property
+    def available(self) -> bool:
+        return bool(self.model_path) and self.installed
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Worker thread pool, created on first use"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cpu-llm")
+        return self._executor
+    
+    def _get_model(self) -> Any:
+        """Load (once per worker thread) and return the model"""
+        if getattr(self._local, "model", None) is None:
+            from llama_cpp import Llama
+            logger.info(f"Loading CPU model {self.model_path} in {threading.current_thread().name}")
+            self._local.model = Llama(
+                model_path=self.model_path,
+                n_ctx=self.context_tokens,
+                n_threads=self.threads,
+                verbose=False
+            )
+        return self._local.model
+    
+    def _complete_sync(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Any:
+        """Run a completion on a worker thread"""
+        from openai.types.chat import ChatCompletion
+        result = self._get_model().create_chat_completion(messages=messages, **params)
+        result["model"] = self.model
+        return ChatCompletion.model_validate(result)
+    
+    def _stream_sync(
+        self,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue,
+        stop: threading.Event
+    ) -> None:
+        """Generate on a worker thread, handing chunks to the event loop until stopped"""
+        try:
+            for chunk in self._get_model().create_chat_completion(messages=messages, stream=True, **params):
+                if stop.is_set():
+                    break
+                content = chunk["choices"][0]["delta"].get("content") if chunk["choices"] else None
+                if content:
+                    loop.call_soon_threadsafe(queue.put_nowait, content)
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+    
+    async def complete(self, messages: List[Dict[str, str]], model: Optional[str] = None, **params: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._complete_sync, messages, self._adapt(params))
+    
+    async def open_stream(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        loop.run_in_executor(self.executor, self._stream_sync, messages, self._adapt(params), loop, queue, stop)
+        return self._iter_queue(queue, stop)
+    
+    async def _iter_queue(self, queue: asyncio.Queue, stop: threading.Event) -> AsyncIterator[str]:
+        """Yield chunks produced by the worker thread"""
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Stop generating if the consumer stopped early
+            stop.set()
+    
+    def _adapt(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep only the generation parameters llama.cpp understands"""
+        supported = ("temperature", "max_tokens", "top_p", "stop", "frequency_penalty", "presence_penalty")
+        return {key: value for key, value in params.items() if key in supported}
+    
+    async def prewarm(self) -> None:
+        if self.available:
+            # Load the model in a worker before the first request pays for it
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._get_model)
+    
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class LLMRouter:
+    """Chooses a backend per request from the configured routing rules"""
+    
+    def __init__(self):
+        self.openai = OpenAIBackend(
+            name="openai",
+            model=settings.OPENAI_MODEL,
+            api_key="" if settings.TEST_MODE else settings.OPENAI_API_KEY
+        )
+        self.backends: Dict[str, LLMBackend] = {"openai": self.openai}
+        if settings.LOCAL_LLM_URL:
+            self.backends["local"] = OpenAIBackend(
+                name="local",
+                model=settings.LOCAL_LLM_MODEL,
+                api_key=settings.LOCAL_LLM_API_KEY,
+                base_url=settings.LOCAL_LLM_URL
+            )
+        if settings.CPU_MODEL_PATH:
+            self.backends["cpu"] = CPUModelBackend(
+                model_path=settings.CPU_MODEL_PATH,
+                workers=settings.CPU_MODEL_WORKERS,
+                context_tokens=settings.CPU_MODEL_CONTEXT_TOKENS,
+                threads=settings.CPU_MODEL_THREADS
+            )
+        
+        self.default_backend = settings.LLM_DEFAULT_BACKEND
+        self.simple_backend = settings.LLM_SIMPLE_BACKEND or None
+        self.summary_backend = settings.LLM_SUMMARY_BACKEND or None
+        self.simple_max_chars = settings.LLM_SIMPLE_MAX_CHARS
+        self.simple_max_history = settings.LLM_SIMPLE_MAX_HISTORY
+        self.fallback_to_default = settings.LLM_FALLBACK_TO_DEFAULT
+        
+        for name in (self.default_backend, self.simple_backend, self.summary_backend):
+            if name and name not in self.backends:
+                logger.warning(f"LLM backend '{name}' is not configured, using the default backend instead")
+        
+        self.fallbacks = 0
+    
+    def get(self, name: Optional[str]) -> Optional[LLMBackend]:
+        """Get a backend by name if it is configured and available"""
+        backend = self.backends.get(name) if name else None
+        return backend if backend is not None and backend.available else None
+    
+    @property
+    def default(self) -> Optional[LLMBackend]:
+        """The default backend, or None if it is unavailable (e.g. no API key)"""
+        return self.get(self.default_backend)
+    
+    def is_simple(self, user_message: str, conversation_history: List[Dict[str, str]]) -> bool:
+        """Short messages early in a conversation are cheap enough for on-box models"""
+        return (
+            len(user_message) <= self.simple_max_chars
+            and len(conversation_history) <= self.simple_max_history
+        )
+    
+    def select(
+        self,
+        user_message: str = "",
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        purpose: str = "chat"
+    ) -> Optional[LLMBackend]:
+        """
+        Choose the backend for a request
+        
+        Args:
+            user_message: The customer's message
+            conversation_history: Previous messages in the conversation
+            purpose: "chat" or "summary"
+        
+        Returns:
+            The backend to use, or None if no backend is available (mock responses)
+        """
+        if purpose == "summary":
+            routed = self.get(self.summary_backend)
+        elif self.simple_backend and self.is_simple(user_message, conversation_history or []):
+            routed = self.get(self.simple_backend)
+        else:
+            routed = None
+        return routed or self.default
+    
+    def fallback_for(self, backend: LLMBackend) -> Optional[LLMBackend]:
+        """
+        Get the backend to retry on after a routed backend failed
+        
+        Args:
+            backend: The backend that failed
+        
+        Returns:
+            The default backend, or None if there is nothing to fall back to
+        """
+        default = self.default
+        if not self.fallback_to_default or default is None or default is backend:
+            return None
+        self.fallbacks += 1
+        return default
+    
+    async def prewarm(self) -> None:
+        """Prewarm every configured backend"""
+        for backend in self.backends.values():
+            try:
+                await backend.prewarm()
+            except Exception as e:
+                logger.warning(f"Prewarming LLM backend '{backend.name}' failed: {str(e)}")
+    
+    async def close(self) -> None:
+        """Release resources of every backend"""
+        for backend in self.backends.values():
+            await backend.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing and per-backend statistics"""
+        return {
+            "default_backend": self.default_backend,
+            "simple_backend": self.simple_backend,
+            "summary_backend": self.summary_backend,
+            "fallbacks": self.fallbacks,
+            "backends": {name: backend.get_stats() for name, backend in self.backends.items()}
+        }
+
+
+# Global LLM router instance
+llm_router = LLMRouter()
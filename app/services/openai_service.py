@@ -2,11 +2,21 @@
 OpenAI service for handling AI chat completions
 """
 
+import asyncio
 import logging
-from typing import List, Dict, Optional
-from openai import AsyncOpenAI
-from openai import APIError, RateLimitError, APIConnectionError
+import time
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, List, Dict, Optional
 from app.core.config import settings
+from app.core.tracing import tracer, SPAN_KIND_CLIENT
+from app.models.schemas import TokenUsage
+from app.services.prompt_builder import prompt_builder
+from app.services.hedging import hedging_policy
+from app.services.disconnect_monitor import disconnect_monitor
+from app.services.quota_guard import quota_guard, QuotaExceeded
+from app.services.traffic_recorder import traffic_recorder
+from app.services.llm_backends import LLMBackend, llm_router
+from app.services.generation_profiles import generation_profiles
 
 logger = logging.getLogger(__name__)
 
@@ -18,18 +28,12 @@ class OpenAIService:
         self.test_mode = settings.TEST_MODE
         self.api_key = settings.OPENAI_API_KEY
         
-        if not self.test_mode and self.api_key:
-            self.client = AsyncOpenAI(api_key=self.api_key)
-        else:
-            self.client = None
-            if self.test_mode:
-                logger.info("Running in TEST_MODE - using mock responses")
-            else:
-                logger.warning("No OpenAI API key found - using mock responses")
+        if self.test_mode:
+            logger.info("Running in TEST_MODE - using mock responses")
+        elif not self.api_key:
+            logger.warning("No OpenAI API key found - using mock responses")
         
         self.model = settings.OPENAI_MODEL
-        self.temperature = settings.OPENAI_TEMPERATURE
-        self.max_tokens = settings.OPENAI_MAX_TOKENS
         
         # Customer service system prompt
         self.system_prompt = """You are a professional, friendly, and helpful customer service representative. 
@@ -46,6 +50,25 @@ Guidelines:
 - Thank customers for their patience and business
 
 Remember: Your goal is to make every customer interaction positive and helpful."""
+
+        # Prompt used to compress older turns into a running summary
+        self.summary_prompt = """Summarize the following customer service conversation in a few sentences.
+Keep every concrete detail the assistant may need later: names, order numbers, tracking numbers,
+products, dates, amounts, and any open issues or promises made. Do not add new information."""
+
+    @property
+    def client(self):
+        """OpenAI API client, or None in test mode / without an API key"""
+        return llm_router.openai.client
+    
+    @client.setter
+    def client(self, value) -> None:
+        llm_router.openai.client = value
+    
+    async def prewarm(self) -> None:
+        """Open upstream keep-alive connections and load local models before the first customer requests"""
+        if not self.test_mode:
+            await llm_router.prewarm()
     
     def _get_mock_response(self, user_message: str, customer_name: Optional[str] = None) -> str:
         """Generate a mock response for testing/demo purposes"""
@@ -66,11 +89,140 @@ Remember: Your goal is to make every customer interaction positive and helpful."
         else:
             return f"{greeting}Thank you for your message. I understand you're asking about: '{user_message}'. Let me help you with that. Could you provide a bit more detail so I can assist you better?"
     
+    def get_degraded_response(self, user_message: str, customer_name: Optional[str] = None) -> str:
+        """
+        Generate a local fallback answer while the OpenAI quota is exhausted
+        
+        Args:
+            user_message: The customer's message
+            customer_name: Optional customer name for personalization
+        
+        Returns:
+            Canned answer for the detected intent
+        """
+        return self._get_mock_response(user_message, customer_name)
+    
+    async def _probe_quota(self) -> bool:
+        """
+        Make a minimal completion call to check whether the quota is available again
+        
+        Returns:
+            True if the call succeeded
+        """
+        await self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": "ping"}],
+            max_tokens=1
+        )
+        return True
+    
+    async def _create_completion(self, model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Any:
+        """Make a single chat completion call to the OpenAI API"""
+        with tracer.span("llm.attempt", kind=SPAN_KIND_CLIENT, **{"llm.model": model}):
+            return await llm_router.openai.complete(
+                messages,
+                model=model,
+                **params,
+                top_p=1.0,
+                frequency_penalty=0.0,
+                presence_penalty=0.0
+            )
+    
+    async def _hedged_completion(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Any:
+        """
+        Make a chat completion call, firing a backup request if the primary is slow
+        
+        The first successful response wins and the other request is cancelled.
+        
+        Args:
+            messages: Messages list for the OpenAI API
+            params: Generation parameters (max_tokens, temperature, stop)
+        
+        Returns:
+            Chat completion response
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        primary = asyncio.create_task(self._create_completion(self.model, messages, params))
+        hedge = None
+        pending = {primary}
+        errors = []
+        
+        try:
+            hedge_delay = hedging_policy.get_hedge_delay()
+            if hedge_delay is not None:
+                done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done and hedging_policy.try_acquire_hedge():
+                    hedge_model = hedging_policy.fallback_model or self.model
+                    logger.info(f"Primary request slower than {hedge_delay:.2f}s, hedging with model: {hedge_model}")
+                    tracer.current_span().increment("llm.retry_count")
+                    hedge = asyncio.create_task(self._create_completion(hedge_model, messages, params))
+                    pending.add(hedge)
+                pending |= done
+            
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        hedging_policy.record_result(loop.time() - start, hedge_won=task is hedge)
+                        return task.result()
+                    errors.append(task.exception())
+            
+            raise errors[0]
+        
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _complete(self, backend: LLMBackend, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Any:
+        """Make a chat completion call on a backend (OpenAI API calls are hedged)"""
+        backend.calls += 1
+        try:
+            if backend is llm_router.openai:
+                # Skip the upstream round trip while the quota is known to be exhausted
+                quota_guard.check()
+                return await self._hedged_completion(messages, params)
+            return await backend.complete(messages, **params)
+        except Exception:
+            backend.failures += 1
+            raise
+    
+    async def _routed_completion(
+        self,
+        backend: LLMBackend,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any]
+    ) -> Any:
+        """
+        Make a chat completion call on the routed backend, retrying on the default backend if it fails
+        
+        Args:
+            backend: Backend chosen by the router
+            messages: Messages list in OpenAI format
+            params: Generation parameters (max_tokens, temperature, stop)
+        
+        Returns:
+            Chat completion response
+        """
+        try:
+            return await self._complete(backend, messages, params)
+        except Exception as e:
+            fallback = llm_router.fallback_for(backend)
+            if fallback is None:
+                raise
+            logger.warning(f"LLM backend '{backend.name}' failed ({str(e)}), falling back to '{fallback.name}'")
+            span = tracer.current_span()
+            span.increment("llm.retry_count")
+            span.set_attribute("llm.fallback_backend", fallback.name)
+            return await self._complete(fallback, messages, params)
+    
     async def get_chat_response(
         self,
         user_message: str,
         conversation_history: List[Dict[str, str]],
-        customer_name: Optional[str] = None
+        customer_name: Optional[str] = None,
+        deadline: Optional[float] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None
     ) -> str:
         """
         Get AI response from OpenAI API or mock response in test mode
@@ -79,44 +231,68 @@ Remember: Your goal is to make every customer interaction positive and helpful."
             user_message: The customer's message
             conversation_history: Previous messages in the conversation
             customer_name: Optional customer name for personalization
+            deadline: Seconds the caller is willing to wait (defaults to the SLO setting)
+            on_usage: Optional callback that receives the token usage of the call
             
         Returns:
             AI-generated response string
             
         Raises:
+            QuotaExceeded: If the OpenAI quota is exhausted
             Exception: If OpenAI API call fails (in production mode)
         """
-        # Use mock response if in test mode or no API key
-        if self.test_mode or not self.client:
+        # Use mock response if in test mode or no backend is available
+        backend = llm_router.select(user_message, conversation_history)
+        if self.test_mode or backend is None:
             logger.info("Using mock response (TEST_MODE or no API key)")
             return self._get_mock_response(user_message, customer_name)
         
+        timeout = deadline if deadline is not None else settings.REQUEST_DEADLINE_SECONDS
+        
         try:
-            # Build messages list
-            messages = [{"role": "system", "content": self.system_prompt}]
-            
-            # Add conversation history
-            messages.extend(conversation_history)
-            
-            # Add current user message with optional personalization
-            if customer_name:
-                personalized_message = f"[Customer: {customer_name}] {user_message}"
-            else:
-                personalized_message = user_message
+            # Build messages list (stable prefix first, variable data last)
+            with tracer.span("prompt.build") as span:
+                messages = prompt_builder.build_messages(
+                    system_prompt=self.system_prompt,
+                    conversation_history=conversation_history,
+                    user_message=user_message,
+                    customer_name=customer_name
+                )
+                span.set_attribute("prompt.messages", len(messages))
             
-            messages.append({"role": "user", "content": personalized_message})
+            # Output limits follow the intent of the turn
+            profile = generation_profiles.select(user_message, conversation_history)
+            params = generation_profiles.get_params(profile)
             
-            # Call OpenAI API
-            logger.info(f"Calling OpenAI API with model: {self.model}")
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0
+            # Call the routed backend (bounded by the request deadline)
+            logger.info(
+                f"Calling LLM backend '{backend.name}' with model: {backend.model} "
+                f"(profile: {profile}, max_tokens: {params['max_tokens']})"
             )
+            started = time.perf_counter()
+            with tracer.span(
+                "llm.completion",
+                kind=SPAN_KIND_CLIENT,
+                **{
+                    "llm.backend": backend.name,
+                    "llm.model": backend.model,
+                    "llm.profile": profile,
+                    "llm.max_tokens": params["max_tokens"],
+                    "llm.retry_count": 0
+                }
+            ) as span:
+                response = await asyncio.wait_for(
+                    self._routed_completion(backend, messages, params),
+                    timeout=timeout
+                )
+                self._annotate_span(span, response)
+            traffic_recorder.record_upstream(response, time.perf_counter() - started)
+            generation_profiles.record_output(profile, response)
+            
+            # Track prompt cache and completion usage
+            prompt_builder.record_usage(response.usage)
+            disconnect_monitor.record_completion(response.usage)
+            self._report_usage(response, on_usage)
             
             # Extract response
             ai_response = response.choices[0].message.content.strip()
@@ -124,38 +300,213 @@ Remember: Your goal is to make every customer interaction positive and helpful."
             
             return ai_response
         
-        except RateLimitError as e:
+        except Exception as e:
+            raise self._translate_error(e, timeout)
+    
+    async def stream_chat_response(
+        self,
+        user_message: str,
+        conversation_history: List[Dict[str, str]],
+        customer_name: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream an AI response token by token from OpenAI API or mock response in test mode
+        
+        Args:
+            user_message: The customer's message
+            conversation_history: Previous messages in the conversation
+            customer_name: Optional customer name for personalization
+            deadline: Seconds to wait for the stream to start (defaults to the SLO setting)
+        
+        Yields:
+            Response text chunks as they are generated
+        
+        Raises:
+            Exception: If OpenAI API call fails (in production mode)
+        """
+        backend = llm_router.select(user_message, conversation_history)
+        if self.test_mode or backend is None:
+            logger.info("Using mock streamed response (TEST_MODE or no API key)")
+            for word in self._get_mock_response(user_message, customer_name).split(" "):
+                yield word + " "
+                await asyncio.sleep(0)
+            return
+        
+        if backend is llm_router.openai:
+            quota_guard.check()
+        
+        timeout = deadline if deadline is not None else settings.REQUEST_DEADLINE_SECONDS
+        
+        try:
+            messages = prompt_builder.build_messages(
+                system_prompt=self.system_prompt,
+                conversation_history=conversation_history,
+                user_message=user_message,
+                customer_name=customer_name
+            )
+            
+            logger.info(f"Streaming from LLM backend '{backend.name}' with model: {backend.model}")
+            backend.calls += 1
+            params = generation_profiles.get_params(
+                generation_profiles.select(user_message, conversation_history)
+            )
+            stream = await asyncio.wait_for(backend.open_stream(messages, **params), timeout=timeout)
+            
+            # Closing the stream stops generation if the consumer stopped early
+            async with aclosing(stream):
+                async for chunk in stream:
+                    yield chunk
+        
+        except Exception as e:
+            raise self._translate_error(e, timeout)
+    
+    def _annotate_span(self, span: Any, response: Any) -> None:
+        """Record the model, token counts and finish reason of a completion on its span"""
+        span.set_attribute("llm.response_model", getattr(response, "model", None))
+        span.set_attribute("llm.finish_reason", getattr(response.choices[0], "finish_reason", None))
+        if response.usage is not None:
+            details = getattr(response.usage, "prompt_tokens_details", None)
+            span.set_attribute("llm.prompt_tokens", response.usage.prompt_tokens)
+            span.set_attribute("llm.completion_tokens", response.usage.completion_tokens)
+            span.set_attribute("llm.cached_tokens", getattr(details, "cached_tokens", 0) or 0)
+    
+    def _report_usage(self, response: Any, on_usage: Optional[Callable[[TokenUsage], None]]) -> None:
+        """
+        Pass the token usage of a completion to the caller's callback
+        
+        Args:
+            response: Chat completion response
+            on_usage: Optional callback that receives the token usage
+        """
+        if response.usage is None:
+            return
+        
+        details = getattr(response.usage, "prompt_tokens_details", None)
+        usage = TokenUsage(
+            model=getattr(response, "model", None) or self.model,
+            prompt_tokens=response.usage.prompt_tokens or 0,
+            completion_tokens=response.usage.completion_tokens or 0,
+            cached_tokens=getattr(details, "cached_tokens", 0) or 0
+        )
+        if on_usage is not None:
+            on_usage(usage)
+    
+    def _translate_error(self, e: Exception, timeout: float) -> Exception:
+        """
+        Convert an OpenAI client error into an exception with a user-friendly message
+        
+        Args:
+            e: The original exception
+            timeout: Deadline that applied to the failed call, in seconds
+        
+        Returns:
+            Exception to raise to the caller
+        """
+        from openai import APIError, RateLimitError, APIConnectionError
+        
+        if isinstance(e, QuotaExceeded):
+            return e
+        
+        if isinstance(e, asyncio.TimeoutError):
+            hedging_policy.record_deadline_exceeded()
+            logger.error(f"OpenAI request exceeded its deadline of {timeout:.2f}s")
+            return Exception("Request deadline exceeded. Please try again in a moment.")
+        
+        if isinstance(e, RateLimitError):
             error_msg = str(e)
             logger.error(f"OpenAI rate limit/quota error: {error_msg}")
             
             # Check if it's a quota issue
             if "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
-                raise Exception("OpenAI API quota exceeded. Please check your billing and plan at https://platform.openai.com/account/billing")
+                return self._quota_exceeded()
             else:
-                raise Exception("Rate limit exceeded. Please try again in a moment.")
+                return Exception("Rate limit exceeded. Please try again in a moment.")
         
-        except APIConnectionError as e:
+        if isinstance(e, APIConnectionError):
             logger.error(f"OpenAI connection error: {str(e)}")
-            raise Exception("Connection error. Please check your internet connection and try again.")
+            return Exception("Connection error. Please check your internet connection and try again.")
         
-        except APIError as e:
+        if isinstance(e, APIError):
             error_msg = str(e)
             logger.error(f"OpenAI API error: {error_msg}")
             
             # Provide more helpful error messages
             if "quota" in error_msg.lower() or "insufficient_quota" in error_msg.lower():
-                raise Exception("OpenAI API quota exceeded. Please check your billing and plan at https://platform.openai.com/account/billing")
+                return self._quota_exceeded()
             elif "invalid_api_key" in error_msg.lower() or "authentication" in error_msg.lower():
-                raise Exception("Invalid OpenAI API key. Please check your API key in the .env file.")
+                return Exception("Invalid OpenAI API key. Please check your API key in the .env file.")
             else:
-                raise Exception(f"OpenAI API error: {error_msg}")
+                return Exception(f"OpenAI API error: {error_msg}")
         
-        except Exception as e:
-            logger.error(f"Unexpected error in OpenAI service: {str(e)}", exc_info=True)
-            # Re-raise the exception with a user-friendly message
-            if "quota" in str(e).lower():
-                raise Exception("OpenAI API quota exceeded. Please check your billing and plan.")
-            raise Exception(f"An unexpected error occurred: {str(e)}")
+        logger.error(f"Unexpected error in OpenAI service: {str(e)}", exc_info=True)
+        # Re-raise the exception with a user-friendly message
+        if "quota" in str(e).lower():
+            return self._quota_exceeded()
+        return Exception(f"An unexpected error occurred: {str(e)}")
+    
+    def _quota_exceeded(self) -> QuotaExceeded:
+        """Trip the quota guard and build the error for the failed call"""
+        quota_guard.trip(probe=self._probe_quota)
+        return QuotaExceeded("OpenAI API quota exceeded. Please check your billing and plan at https://platform.openai.com/account/billing")
+    
+    def _get_mock_summary(
+        self,
+        messages: List[Dict[str, str]],
+        previous_summary: Optional[str] = None
+    ) -> str:
+        """Generate an extractive summary for testing/demo purposes"""
+        customer_points = [
+            msg["content"][:100] for msg in messages if msg["role"] == "user"
+        ]
+        summary = "Customer said: " + " | ".join(customer_points)
+        if previous_summary:
+            summary = f"{previous_summary} {summary}"
+        return summary[-2000:]
+    
+    async def summarize_conversation(
+        self,
+        messages: List[Dict[str, str]],
+        previous_summary: Optional[str] = None,
+        on_usage: Optional[Callable[[TokenUsage], None]] = None
+    ) -> str:
+        """
+        Compress older conversation turns into a short running summary
+        
+        Args:
+            messages: Older messages to fold into the summary
+            previous_summary: Existing running summary to extend, if any
+            on_usage: Optional callback that receives the token usage of the call
+        
+        Returns:
+            Updated summary string
+        
+        Raises:
+            Exception: If OpenAI API call fails (in production mode)
+        """
+        backend = llm_router.select(purpose="summary")
+        if self.test_mode or backend is None:
+            return self._get_mock_summary(messages, previous_summary)
+        
+        if backend is llm_router.openai:
+            quota_guard.check()
+        
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+        if previous_summary:
+            transcript = f"Previous summary: {previous_summary}\n\n{transcript}"
+        
+        backend.calls += 1
+        response = await backend.complete(
+            [
+                {"role": "system", "content": self.summary_prompt},
+                {"role": "user", "content": transcript}
+            ],
+            temperature=0.0,
+            max_tokens=settings.SUMMARY_MAX_TOKENS
+        )
+        
+        self._report_usage(response, on_usage)
+        return response.choices[0].message.content.strip()
 
 
 # Global OpenAI service instance
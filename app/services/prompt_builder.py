@@ -0,0 +1,95 @@
+"""
+Prompt assembly that keeps the request prefix stable for provider-side prompt caching
+"""
+
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PromptBuilder:
+    """
+    Builds chat completion messages with a cache-friendly layout
+
+    Layout: static system prompt, conversation history (verbatim, as stored),
+    the current user message, then any per-request variable data. Everything
+    before the current turn is byte-identical to the previous request, so the
+    provider can reuse its cached prompt prefix. The exceptions are turns where
+    a new summary replaced older messages or a block of history was trimmed.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.cache_hits = 0
+
+    def build_messages(
+        self,
+        system_prompt: str,
+        conversation_history: List[Dict[str, str]],
+        user_message: str,
+        customer_name: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        Assemble the messages list for a chat completion request
+
+        Args:
+            system_prompt: Static system prompt (must not vary between requests)
+            conversation_history: Previous messages in the conversation
+            user_message: The customer's message, sent verbatim
+            customer_name: Optional customer name, appended after the user message
+
+        Returns:
+            List of message dictionaries for OpenAI API
+        """
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend(conversation_history)
+        messages.append({"role": "user", "content": user_message})
+
+        # Variable data goes last so it never invalidates the cached prefix
+        if customer_name:
+            messages.append({
+                "role": "system",
+                "content": f"The customer's name is {customer_name}."
+            })
+
+        return messages
+
+    def record_usage(self, usage: Any) -> None:
+        """
+        Record prompt and cached token counts from an upstream usage object
+
+        Args:
+            usage: The `usage` field of a chat completion response (may be None)
+        """
+        if usage is None:
+            return
+
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        if cached_tokens > 0:
+            self.cache_hits += 1
+
+        logger.debug(f"Prompt tokens: {prompt_tokens}, cached: {cached_tokens}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get prompt cache statistics"""
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cache_hits": self.cache_hits,
+            "request_hit_rate": self.cache_hits / self.requests if self.requests else 0.0,
+            "token_hit_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+        }
+
+
+# Global prompt builder instance
+prompt_builder = PromptBuilder()
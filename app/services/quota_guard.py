@@ -0,0 +1,116 @@
+"""
+Quota state tracking: stops upstream calls while the OpenAI quota is exhausted
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaExceeded(Exception):
+    """Raised when the OpenAI quota is exhausted (or known to be, during the cool-down)"""
+
+
+class QuotaGuard:
+    """Trips on a quota error and probes in the background until the quota is back"""
+    
+    def __init__(self):
+        self.cooldown = settings.QUOTA_COOLDOWN_SECONDS
+        self.max_probe_interval = settings.QUOTA_PROBE_MAX_INTERVAL_SECONDS
+        
+        self.exhausted_since: Optional[float] = None
+        self.next_probe_at: Optional[float] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        
+        self.trips = 0
+        self.probes = 0
+        self.short_circuited = 0
+    
+    def is_exhausted(self) -> bool:
+        """Check whether upstream calls should be skipped right now"""
+        return self.exhausted_since is not None
+    
+    def check(self) -> None:
+        """
+        Fail fast instead of calling upstream while the quota is exhausted
+        
+        Raises:
+            QuotaExceeded: If the quota is currently exhausted
+        """
+        if self.is_exhausted():
+            self.short_circuited += 1
+            raise QuotaExceeded("OpenAI API quota exceeded. Please check your billing and plan at https://platform.openai.com/account/billing")
+    
+    def trip(self, probe: Callable[[], Awaitable[bool]]) -> None:
+        """
+        Record a quota error and start probing for recovery in the background
+        
+        Args:
+            probe: Coroutine function that makes a minimal upstream call and
+                returns True once the quota is available again
+        """
+        if self.is_exhausted():
+            return
+        
+        self.exhausted_since = time.time()
+        self.trips += 1
+        logger.warning(
+            f"OpenAI quota exhausted - skipping upstream calls, first recovery check in {self.cooldown}s"
+        )
+        self._probe_task = asyncio.create_task(self._probe_until_recovered(probe))
+    
+    async def _probe_until_recovered(self, probe: Callable[[], Awaitable[bool]]) -> None:
+        """Probe after the cool-down, backing off exponentially until the quota is back"""
+        interval = self.cooldown
+        while True:
+            self.next_probe_at = time.time() + interval
+            await asyncio.sleep(interval)
+            
+            self.probes += 1
+            try:
+                recovered = await probe()
+            except Exception as e:
+                logger.warning(f"Quota recovery check failed: {str(e)}")
+                recovered = False
+            
+            if recovered:
+                logger.info(
+                    f"OpenAI quota available again after {time.time() - self.exhausted_since:.0f}s"
+                )
+                self.exhausted_since = None
+                self.next_probe_at = None
+                self._probe_task = None
+                return
+            
+            interval = min(interval * 2, self.max_probe_interval)
+    
+    async def stop(self) -> None:
+        """Stop the background recovery checks"""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get quota state and fast-fail statistics"""
+        now = time.time()
+        return {
+            "exhausted": self.is_exhausted(),
+            "exhausted_for_seconds": round(now - self.exhausted_since, 1) if self.exhausted_since else None,
+            "next_check_in_seconds": round(max(self.next_probe_at - now, 0), 1) if self.next_probe_at else None,
+            "trips": self.trips,
+            "recovery_checks": self.probes,
+            "short_circuited_calls": self.short_circuited,
+            "degraded_fallback": settings.QUOTA_DEGRADED_FALLBACK
+        }
+
+
+# Global quota guard instance
+quota_guard = QuotaGuard()
@@ -0,0 +1,112 @@
+"""
+Background summarization service that folds older turns into a running summary
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Set
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.services.conversation_manager import conversation_manager
+from app.services.openai_service import openai_service
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationSummarizer:
+    """Compresses long conversations off the request path"""
+
+    def __init__(self):
+        self.enabled = settings.SUMMARY_ENABLED
+        self.trigger_messages = settings.SUMMARY_TRIGGER_MESSAGES
+        self.keep_recent = settings.SUMMARY_KEEP_RECENT_MESSAGES
+        self.retry_cooldown = settings.SUMMARY_RETRY_COOLDOWN_SECONDS
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._in_progress: Set[str] = set()
+        # Conversation ID -> monotonic time before which a failed summary is not retried
+        self._retry_after: Dict[str, float] = {}
+
+    def maybe_schedule(self, conversation_id: str) -> bool:
+        """
+        Schedule a background summarization if the conversation is long enough
+
+        Args:
+            conversation_id: Conversation ID to check
+
+        Returns:
+            True if a summarization task was scheduled
+        """
+        if not self.enabled or conversation_id in self._in_progress:
+            return False
+
+        if conversation_manager.get_message_count(conversation_id) < self.trigger_messages:
+            return False
+
+        # Don't add a failing upstream call to every turn while the summary backend is erroring
+        retry_after = self._retry_after.get(conversation_id)
+        if retry_after is not None:
+            if time.monotonic() < retry_after:
+                return False
+            del self._retry_after[conversation_id]
+
+        self._in_progress.add(conversation_id)
+        task = asyncio.create_task(self._summarize(conversation_id))
+        self._tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._finish(conversation_id))
+        return True
+
+    def _finish(self, conversation_id: str) -> None:
+        """Forget a finished summarization task"""
+        self._in_progress.discard(conversation_id)
+        self._tasks.pop(conversation_id, None)
+
+    async def _summarize(self, conversation_id: str) -> None:
+        """Summarize older messages and store the result in the conversation"""
+        # Runs after the turn that scheduled it has returned, so it gets a trace of its own
+        with tracer.span("conversation.summarize", root=True, **{"conversation.id": conversation_id}) as span:
+            to_summarize = conversation_manager.get_messages_to_summarize(
+                conversation_id, self.keep_recent
+            )
+            span.set_attribute("summary.messages", len(to_summarize))
+            if not to_summarize:
+                return
+
+            try:
+                summary = await openai_service.summarize_conversation(
+                    messages=[{"role": msg.role, "content": msg.content} for msg in to_summarize],
+                    previous_summary=conversation_manager.get_summary(conversation_id),
+                    on_usage=lambda usage: conversation_manager.record_usage(conversation_id, usage)
+                )
+            except Exception as e:
+                # The recent turns are still sent verbatim, so a failed summary is not fatal
+                span.record_exception(e)
+                logger.warning(f"Summarization failed for conversation {conversation_id}: {str(e)}")
+                self._record_failure(conversation_id)
+                return
+
+            conversation_manager.apply_summary(conversation_id, summary, to_summarize)
+            logger.info(
+                f"Summarized {len(to_summarize)} messages for conversation {conversation_id} "
+                f"(summary length: {len(summary)})"
+            )
+
+    def _record_failure(self, conversation_id: str) -> None:
+        """Hold off retrying a conversation's summary for the cool-down"""
+        now = time.monotonic()
+        # Drop entries of conversations that never came back
+        for expired_id in [cid for cid, until in self._retry_after.items() if until <= now]:
+            del self._retry_after[expired_id]
+        self._retry_after[conversation_id] = now + self.retry_cooldown
+
+    async def shutdown(self) -> None:
+        """Cancel any pending summarization tasks"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# Global conversation summarizer instance
+conversation_summarizer = ConversationSummarizer()
@@ -0,0 +1,200 @@
+"""
+Opt-in traffic recorder for /chat: captures requests, timing and upstream responses for replay
+"""
+
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+from app.core.config import settings
+from app.models.schemas import ChatRequest
+
+logger = logging.getLogger(__name__)
+
+# Upstream responses captured for the /chat request running in the current context
+_upstream_calls: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("upstream_calls", default=None)
+
+# Request headers that change how /chat behaves and are replayed with the request
+RECORDED_HEADERS = ("Idempotency-Key", "X-Deadline-Ms")
+
+# Recorded in place of customer names while PII redaction is on (the regexes can't recognize names)
+NAME_PLACEHOLDER = "[NAME]"
+
+# Default PII redaction patterns (applied in order)
+PII_PATTERNS = (
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "[EMAIL]"),
+    (re.compile(r"\b(?:\d[ -]?){13,19}\b"), "[CARD]"),
+    (re.compile(r"\+?\d[\d ().-]{7,}\d"), "[PHONE]"),
+)
+
+
+def redact_pii(text: str) -> str:
+    """Replace email addresses, card numbers and phone numbers with placeholders"""
+    for pattern, placeholder in PII_PATTERNS:
+        text = pattern.sub(placeholder, text)
+    return text
+
+
+def mask_name(text: str, name: str) -> str:
+    """Replace whole-word, case-insensitive occurrences of a customer name with the placeholder"""
+    name = name.strip()
+    if not name:
+        return text
+    pattern = rf"(?<!\w){re.escape(name)}(?!\w)"
+    return re.sub(pattern, NAME_PLACEHOLDER, text, flags=re.IGNORECASE)
+
+
+class TrafficRecorder:
+    """Appends one compact JSON line per /chat request to the recording file"""
+    
+    def __init__(self):
+        self.enabled = settings.RECORD_TRAFFIC
+        self.record_file = settings.RECORD_FILE
+        self.redact_pii = settings.RECORD_REDACT_PII
+        self.redactors: List[Callable[[str], str]] = [redact_pii] if self.redact_pii else []
+        # One writer thread keeps file writes off the event loop and in request order
+        self._writer: Optional[ThreadPoolExecutor] = None
+        
+        self.recorded = 0
+    
+    def add_redactor(self, redactor: Callable[[str], str]) -> None:
+        """
+        Register a redaction hook applied to all recorded text
+        
+        Args:
+            redactor: Function that takes text and returns it with sensitive data removed
+        """
+        self.redactors.append(redactor)
+    
+    def redact(self, text: Optional[str]) -> Optional[str]:
+        """Run recorded text through the redaction hooks"""
+        if text is None:
+            return None
+        for redactor in self.redactors:
+            text = redactor(text)
+        return text
+    
+    @contextmanager
+    def record_chat(self, request: ChatRequest, headers: Mapping[str, str]) -> Iterator[Dict[str, Any]]:
+        """
+        Record one /chat request, its outcome and the upstream responses it triggered
+        
+        The caller sets `conversation_id` on the yielded record once it is known.
+        
+        Args:
+            request: Incoming chat request
+            headers: Request headers
+        
+        Yields:
+            Record for the request (written when the block exits)
+        """
+        record = {"t": round(time.time(), 3)}
+        if not self.enabled:
+            yield record
+            return
+        
+        upstream = []
+        token = _upstream_calls.set(upstream)
+        start = time.perf_counter()
+        status = "ok"
+        try:
+            yield record
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            _upstream_calls.reset(token)
+            message = self.redact(request.message)
+            customer_name = request.customer_name
+            if customer_name and self.redact_pii:
+                # Answers are personalized, so the name shows up in the recorded replies too
+                message = mask_name(message, customer_name)
+                for call in upstream:
+                    call["content"] = mask_name(call["content"] or "", customer_name)
+                customer_name = NAME_PLACEHOLDER
+            record.update({
+                "request": {
+                    "message": message,
+                    "conversation_id": request.conversation_id,
+                    "customer_name": self.redact(customer_name)
+                },
+                "headers": {name: headers[name] for name in RECORDED_HEADERS if name in headers},
+                "conversation_id": record.get("conversation_id"),
+                "status": status,
+                "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+                "upstream": upstream
+            })
+            self._write(record)
+    
+    def current_capture(self) -> Optional[List[Dict[str, Any]]]:
+        """Get the upstream capture list of the /chat request recorded in the current context"""
+        return _upstream_calls.get()
+    
+    @contextmanager
+    def capture_upstream(self, upstream: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Capture upstream responses made in this block into a list (e.g. in a worker task)
+        
+        Args:
+            upstream: List that receives the captured responses
+        
+        Yields:
+            The list
+        """
+        token = _upstream_calls.set(upstream)
+        try:
+            yield upstream
+        finally:
+            _upstream_calls.reset(token)
+    
+    def record_upstream(self, response: Any, latency: float) -> None:
+        """
+        Capture an upstream chat completion for the /chat request being recorded
+        
+        Args:
+            response: Chat completion response
+            latency: Seconds the upstream call took
+        """
+        upstream = _upstream_calls.get()
+        if upstream is None:
+            return
+        
+        usage = response.usage
+        details = getattr(usage, "prompt_tokens_details", None)
+        upstream.append({
+            "model": getattr(response, "model", None),
+            "content": self.redact(response.choices[0].message.content),
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0,
+            "latency_ms": round(latency * 1000, 1)
+        })
+    
+    def _write(self, record: Dict[str, Any]) -> None:
+        """Queue a record for the writer thread (serialized now, so later changes don't leak in)"""
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="traffic-recorder")
+        self._writer.submit(self._append, json.dumps(record, separators=(",", ":")) + "\n")
+    
+    def _append(self, line: str) -> None:
+        """Append a line to the recording file"""
+        try:
+            with open(self.record_file, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.recorded += 1
+        except OSError as e:
+            logger.error(f"Failed to write traffic recording: {str(e)}")
+    
+    def close(self) -> None:
+        """Wait for queued records to be written"""
+        if self._writer is not None:
+            self._writer.shutdown(wait=True)
+            self._writer = None
+
+
+# Global traffic recorder instance
+traffic_recorder = TrafficRecorder()
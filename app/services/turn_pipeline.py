@@ -0,0 +1,243 @@
+"""
+Per-conversation ordered turn pipeline that merges rapid-fire messages into one upstream request
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.models.schemas import ChatResponse
+from app.services.chat_service import chat_service
+from app.services.hedging import hedging_policy
+from app.services.traffic_recorder import traffic_recorder
+
+logger = logging.getLogger(__name__)
+
+
+class TurnPipeline:
+    """Runs one turn at a time per conversation; messages that queue up meanwhile share the next turn"""
+    
+    def __init__(self):
+        self.merge_enabled = settings.TURN_MERGE_ENABLED
+        self.max_merge = settings.TURN_MERGE_MAX_MESSAGES if self.merge_enabled else 1
+        
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        
+        self.turns = 0
+        self.merged_messages = 0
+        self.largest_merge = 0
+    
+    async def submit(
+        self,
+        message: str,
+        conversation_id: Optional[str] = None,
+        customer_name: Optional[str] = None,
+        deadline: Optional[float] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+    ) -> ChatResponse:
+        """
+        Queue a message behind the conversation's in-flight turn and wait for its response
+        
+        Args:
+            message: The customer's message
+            conversation_id: Optional existing conversation ID
+            customer_name: Optional customer name for personalization
+            deadline: Seconds the caller is willing to wait, including time queued behind earlier turns
+                (defaults to the SLO setting)
+            is_disconnected: Optional callback; the turn is cancelled once every merged client is gone
+        
+        Returns:
+            ChatResponse for the turn the message was answered in
+        
+        Raises:
+            ClientDisconnected: If every client of the turn disconnected before the response was ready
+            Exception: If the deadline passed while queued, or the chat turn fails
+        """
+        # New conversations have no earlier turn to wait for
+        if not conversation_id:
+            return await chat_service.process_message(
+                message=message,
+                customer_name=customer_name,
+                deadline=deadline,
+                is_disconnected=is_disconnected
+            )
+        
+        if deadline is None:
+            deadline = settings.REQUEST_DEADLINE_SECONDS
+        
+        with tracer.span("turn_pipeline.submit", **{"conversation.id": conversation_id}) as span:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending.setdefault(conversation_id, []).append({
+                "message": message,
+                "customer_name": customer_name,
+                # Absolute, so time spent waiting behind the running turn counts against it
+                "expires_at": loop.time() + deadline,
+                "is_disconnected": is_disconnected,
+                "future": future,
+                "span": span,
+                # The worker task runs in another context, so upstream responses are handed back explicitly
+                "upstream": traffic_recorder.current_capture()
+            })
+            if conversation_id not in self._workers:
+                self._workers[conversation_id] = asyncio.create_task(self._run(conversation_id))
+            
+            return await future
+    
+    @asynccontextmanager
+    async def exclusive(self, conversation_id: str) -> AsyncIterator[None]:
+        """
+        Wait for the conversation's turn slot and hold it for a turn the caller runs itself
+        
+        Used for streamed WebSocket turns, which are never merged but must not
+        interleave with HTTP turns of the same conversation.
+        
+        Args:
+            conversation_id: Conversation ID
+        """
+        granted = asyncio.get_running_loop().create_future()
+        released = asyncio.Event()
+        self._pending.setdefault(conversation_id, []).append({
+            "exclusive": True,
+            "future": granted,
+            "released": released
+        })
+        if conversation_id not in self._workers:
+            self._workers[conversation_id] = asyncio.create_task(self._run(conversation_id))
+        
+        try:
+            await granted
+        except asyncio.CancelledError:
+            # Cancelled right after the slot was granted: hand it back
+            released.set()
+            raise
+        try:
+            yield
+        finally:
+            released.set()
+    
+    def _next_batch(self, queue: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Take the next turn off a queue: one exclusive turn, or up to max_merge queued messages"""
+        if queue[0].get("exclusive"):
+            count = 1
+        else:
+            count = next(
+                (i for i, turn in enumerate(queue[:self.max_merge]) if turn.get("exclusive")),
+                min(len(queue), self.max_merge)
+            )
+        batch = [turn for turn in queue[:count] if not turn["future"].done()]
+        del queue[:count]
+        return batch
+    
+    async def _run(self, conversation_id: str) -> None:
+        """Process the conversation's queued messages in order until none are left"""
+        batch: List[Dict[str, Any]] = []
+        try:
+            while self._pending.get(conversation_id):
+                batch = self._next_batch(self._pending[conversation_id])
+                if batch and batch[0].get("exclusive"):
+                    batch[0]["future"].set_result(None)
+                    await batch[0]["released"].wait()
+                elif batch:
+                    await self._run_turn(conversation_id, batch)
+                batch = []
+        except BaseException as e:
+            # Shutdown: don't leave callers waiting on turns that will never run
+            for turn in batch + self._pending.get(conversation_id, []):
+                if turn["future"].done():
+                    continue
+                if isinstance(e, Exception):
+                    turn["future"].set_exception(e)
+                else:
+                    turn["future"].cancel()
+            self._pending.pop(conversation_id, None)
+            raise
+        finally:
+            del self._workers[conversation_id]
+            if not self._pending.get(conversation_id):
+                self._pending.pop(conversation_id, None)
+    
+    async def _run_turn(self, conversation_id: str, batch: List[Dict[str, Any]]) -> None:
+        """Answer a batch of queued messages with a single chat turn"""
+        now = asyncio.get_running_loop().time()
+        expired = [turn for turn in batch if turn["expires_at"] <= now]
+        batch = [turn for turn in batch if turn["expires_at"] > now]
+        if expired:
+            logger.warning(
+                f"{len(expired)} queued messages for conversation {conversation_id} "
+                f"exceeded their deadline before their turn started"
+            )
+            for turn in expired:
+                hedging_policy.record_deadline_exceeded()
+                turn["future"].set_exception(
+                    Exception("Request deadline exceeded. Please try again in a moment.")
+                )
+        if not batch:
+            return
+        
+        if len(batch) > 1:
+            logger.info(f"Merging {len(batch)} queued messages for conversation {conversation_id}")
+        
+        checks = [turn["is_disconnected"] for turn in batch]
+        
+        async def all_disconnected() -> bool:
+            for check in checks:
+                if not await check():
+                    return False
+            return True
+        
+        # The turn runs in the worker task; attach its spans to the first waiting request
+        for turn in batch:
+            turn["span"].set_attribute("turn.merged_messages", len(batch))
+        
+        upstream: List[Dict[str, Any]] = []
+        try:
+            with tracer.use_span(batch[0]["span"]), traffic_recorder.capture_upstream(upstream):
+                response = await chat_service.process_message(
+                    message="\n".join(turn["message"] for turn in batch),
+                    conversation_id=conversation_id,
+                    customer_name=next(
+                        (turn["customer_name"] for turn in reversed(batch) if turn["customer_name"]),
+                        None
+                    ),
+                    deadline=min(turn["expires_at"] for turn in batch) - now,
+                    is_disconnected=all_disconnected if None not in checks else None
+                )
+            if len(batch) > 1:
+                response = response.model_copy(update={"merged_messages": len(batch)})
+        except Exception as e:
+            for turn in batch:
+                if not turn["future"].done():
+                    turn["future"].set_exception(e)
+            return
+        finally:
+            # Every merged request was answered by these upstream calls
+            for turn in batch:
+                if turn["upstream"] is not None:
+                    turn["upstream"].extend(upstream)
+            self.turns += 1
+            self.merged_messages += len(batch) - 1
+            self.largest_merge = max(self.largest_merge, len(batch))
+        
+        for turn in batch:
+            if not turn["future"].done():
+                turn["future"].set_result(response)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get turn pipeline statistics"""
+        return {
+            "merge_enabled": self.merge_enabled,
+            "max_merged_messages": self.max_merge,
+            "active_conversations": len(self._workers),
+            "queued_messages": sum(len(queue) for queue in self._pending.values()),
+            "turns": self.turns,
+            "merged_messages": self.merged_messages,
+            "largest_merge": self.largest_merge
+        }
+
+
+# Global turn pipeline instance
+turn_pipeline = TurnPipeline()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Export conversations from a running Customer Service Chatbot API as NDJSON
+Streams GET /api/v1/conversations/export line by line to a file or stdout
+"""
+
+import argparse
+import os
+import sys
+import urllib.parse
+import urllib.request
+
+API_URL = "http://localhost:8000"  # Change this to your deployed URL
+API_PREFIX = "/api/v1"
+
+
+def export_conversations(api_url, output, since=None, until=None, token=None):
+    """
+    Stream the export endpoint into an output file without buffering the whole export
+
+    Args:
+        api_url: Base URL of the running API
+        output: Writable binary file object
+        since: Optional ISO 8601 lower bound on last update time
+        until: Optional ISO 8601 upper bound on creation time
+        token: Admin API token of the server
+
+    Returns:
+        Number of conversations exported
+    """
+    params = {key: value for key, value in (("since", since), ("until", until)) if value}
+    url = f"{api_url}{API_PREFIX}/conversations/export"
+    if params:
+        url = f"{url}?{urllib.parse.urlencode(params)}"
+
+    request = urllib.request.Request(url)
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+
+    count = 0
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            output.write(line)
+            count += 1
+    return count
+
+
+def main():
+    """Parse arguments and run the export"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default=API_URL, help="Base URL of the running API")
+    parser.add_argument("--since", help="Only conversations updated at or after this ISO 8601 time")
+    parser.add_argument("--until", help="Only conversations created at or before this ISO 8601 time")
+    parser.add_argument("--token", default=os.getenv("ADMIN_API_TOKEN"),
+                        help="Admin API token of the server (default: $ADMIN_API_TOKEN)")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, "wb") as output:
+            count = export_conversations(args.url, output, args.since, args.until, args.token)
+    else:
+        count = export_conversations(args.url, sys.stdout.buffer, args.since, args.until, args.token)
+
+    print(f"✅ Exported {count} conversations", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Replay recorded /chat traffic against the current build of the Customer Service Chatbot API
+Upstream OpenAI responses are served from the recording, so no API key or network is needed
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from contextvars import ContextVar
+from types import SimpleNamespace
+
+# Configure the app for replay before it is imported
+os.environ["TEST_MODE"] = "false"
+os.environ["RECORD_TRAFFIC"] = "false"
+# A hedge would consume a recorded response meant for another call and mask recorded tail latency
+os.environ["HEDGE_ENABLED"] = "false"
+os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+import httpx  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.openai_service import openai_service  # noqa: E402
+from app.services.hedging import hedging_policy  # noqa: E402
+
+# Recorded upstream responses still to be served for the request running in the current context
+_pending_upstream = ContextVar("pending_upstream", default=None)
+
+
+class ReplayCompletions:
+    """Stands in for client.chat.completions and returns recorded responses"""
+
+    def __init__(self, timed):
+        self.timed = timed
+        self.served = 0
+        self.unmatched = 0
+
+    async def create(self, model, messages, **kwargs):
+        pending = _pending_upstream.get()
+        if pending:
+            call = pending.pop(0)
+            self.served += 1
+        else:
+            # e.g. background summaries, which are not part of the recorded request
+            call = {"model": model, "content": "Recorded response not available.", "latency_ms": 0}
+            self.unmatched += 1
+
+        if self.timed:
+            await asyncio.sleep(call["latency_ms"] / 1000)
+
+        return SimpleNamespace(
+            model=call["model"] or model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=call["content"]))],
+            usage=SimpleNamespace(
+                prompt_tokens=call.get("prompt_tokens", 0),
+                completion_tokens=call.get("completion_tokens", 0),
+                prompt_tokens_details=SimpleNamespace(cached_tokens=call.get("cached_tokens", 0))
+            )
+        )
+
+
+def load_recording(path):
+    """Read recorded requests in arrival order"""
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record["t"])
+
+
+async def replay(records, client, speed, timed, concurrency):
+    """
+    Send recorded requests to the app and collect their latencies
+
+    Args:
+        records: Recorded requests in arrival order
+        client: HTTP client bound to the app
+        speed: Arrival time multiplier (ignored when not timed)
+        timed: Preserve recorded arrival times, else send as fast as possible
+        concurrency: Maximum number of requests in flight
+
+    Returns:
+        List of (status_code, latency_seconds) tuples
+    """
+    results = []
+    slots = asyncio.Semaphore(concurrency)
+    # Recorded conversation ID -> latest turn task and future with the replayed conversation ID
+    conversations = {}
+    loop = asyncio.get_running_loop()
+
+    async def send(record, previous_turn, replayed_id):
+        # Turns of one conversation run in order, like the original client sent them
+        if previous_turn is not None:
+            await asyncio.gather(previous_turn, return_exceptions=True)
+
+        request = dict(record["request"])
+        if request.get("conversation_id"):
+            request["conversation_id"] = await replayed_id
+
+        conversation_id = None
+        try:
+            async with slots:
+                _pending_upstream.set(list(record["upstream"]))
+                start = time.perf_counter()
+                response = await client.post("/api/v1/chat", json=request, headers=record.get("headers", {}))
+                results.append((response.status_code, time.perf_counter() - start))
+            if response.status_code == 200:
+                conversation_id = response.json()["conversation_id"]
+        finally:
+            if replayed_id is not None and not replayed_id.done():
+                replayed_id.set_result(conversation_id)
+
+    tasks = []
+    first_arrival = records[0]["t"]
+    replay_start = time.perf_counter()
+    for record in records:
+        if timed:
+            delay = (record["t"] - first_arrival) / speed - (time.perf_counter() - replay_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        key = record["request"].get("conversation_id") or record.get("conversation_id")
+        entry = conversations.get(key) if key else None
+        if key and entry is None:
+            entry = conversations[key] = {"turn": None, "id": loop.create_future()}
+            if record["request"].get("conversation_id"):
+                # Started before the recording began; the app opens a new conversation for it
+                entry["id"].set_result(key)
+
+        task = asyncio.create_task(send(
+            record,
+            entry["turn"] if entry else None,
+            entry["id"] if entry else None
+        ))
+        if entry:
+            entry["turn"] = task
+        tasks.append(task)
+
+    await asyncio.gather(*tasks)
+    return results
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def print_latencies(label, latencies):
+    """Print p50/p95/p99 of latencies given in seconds"""
+    print(f"{label} p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+async def run(args):
+    """Load the recording, replay it and print a summary"""
+    records = load_recording(args.recording)
+    if not records:
+        print("Recording is empty", file=sys.stderr)
+        return
+
+    completions = ReplayCompletions(timed=not args.fast)
+    openai_service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+        start = time.perf_counter()
+        results = await replay(records, client, args.speed, not args.fast, args.concurrency)
+        elapsed = time.perf_counter() - start
+
+    statuses = {}
+    for status_code, _ in results:
+        statuses[status_code] = statuses.get(status_code, 0) + 1
+
+    print("=" * 60)
+    print("🔁 Customer Service Chatbot API - Traffic Replay")
+    print("=" * 60)
+    print(f"Requests replayed:  {len(results)} in {elapsed:.2f}s "
+          f"({'as fast as possible' if args.fast else f'{args.speed}x recorded timing'})")
+    print(f"Status codes:       {json.dumps(statuses, sort_keys=True)}")
+    print(f"Upstream responses: {completions.served} served, {completions.unmatched} not in recording")
+    if hedging_policy.hedges_fired:
+        print(f"Hedged requests:    {hedging_policy.hedges_fired} (replayed latencies are not comparable)")
+    print_latencies("Recorded latency:  ", [record["duration_ms"] / 1000 for record in records])
+    print_latencies("Replayed latency:  ", [latency for _, latency in results])
+    print("=" * 60)
+
+
+def main():
+    """Parse arguments and run the replay"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("recording", nargs="?", default="traffic_recording.jsonl",
+                        help="Recording file written with RECORD_TRAFFIC=true")
+    parser.add_argument("--fast", action="store_true",
+                        help="Send requests as fast as possible and skip recorded upstream latency")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed multiplier for recorded arrival times")
+    parser.add_argument("--concurrency", type=int, default=50,
+                        help="Maximum number of requests in flight")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the Customer Service Chatbot API
+Measures cold import time of app.main and time-to-first-request of a fresh server
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def measure_import_time(runs):
+    """Import app.main in fresh interpreters and return the timings in seconds"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_SNIPPET],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+
+def wait_for_status(url, timeout, data=None):
+    """
+    Poll a URL until it returns HTTP 200 and return the elapsed seconds
+
+    Only connection errors (server not listening yet) are retried; an HTTP
+    error status means the server is up and the request itself failed.
+    """
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        request = urllib.request.Request(
+            url,
+            data=data,
+            headers={"Content-Type": "application/json"} if data else {}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                if response.status != 200:
+                    raise RuntimeError(f"{url} returned HTTP {response.status}")
+                return time.perf_counter() - start
+        except urllib.error.HTTPError as e:
+            # Subclass of URLError, so it must be caught first
+            body = e.read().decode(errors="replace")
+            raise RuntimeError(f"{url} returned HTTP {e.code}: {body}") from None
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.01)
+    raise TimeoutError(f"{url} did not respond within {timeout}s")
+
+
+def measure_first_request(port, timeout):
+    """Start a fresh server and time its first health check and first chat request"""
+    spawn_time = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}/api/v1"
+        wait_for_status(f"{base_url}/health", timeout)
+        ready = time.perf_counter() - spawn_time
+
+        chat_start = time.perf_counter()
+        wait_for_status(
+            f"{base_url}/chat",
+            timeout,
+            data=json.dumps({"message": "Hello, I need help with my order"}).encode()
+        )
+        first_chat = time.perf_counter() - chat_start
+        return ready, first_chat
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    """Run the startup benchmark and print a summary"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="Number of cold starts to measure")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the benchmark server")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the server")
+    parser.add_argument("--skip-server", action="store_true", help="Only measure import time")
+    args = parser.parse_args()
+
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    print("=" * 60)
+    print("⏱️  Customer Service Chatbot API - Startup Benchmark")
+    print("=" * 60)
+
+    imports = measure_import_time(args.runs)
+    print(f"Import app.main:       median {statistics.median(imports) * 1000:.0f} ms, "
+          f"min {min(imports) * 1000:.0f} ms ({args.runs} runs)")
+
+    if args.skip_server:
+        return
+
+    readiness, first_chats = [], []
+    for _ in range(args.runs):
+        ready, first_chat = measure_first_request(args.port, args.timeout)
+        readiness.append(ready)
+        first_chats.append(first_chat)
+
+    print(f"Spawn to first health: median {statistics.median(readiness) * 1000:.0f} ms, "
+          f"min {min(readiness) * 1000:.0f} ms")
+    print(f"First chat request:    median {statistics.median(first_chats) * 1000:.0f} ms, "
+          f"min {min(first_chats) * 1000:.0f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()